@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+@Version: 1
+@Author: Nasy, SX, LC, LX
+@Date: Jun 12, 2016
+@email: sy_n@me.com
+@file: nsll_bench.py
+@license: MIT
+
+CUFE investment 14 Math Modeling
+
+Benchmarks of nsll_mm.
+
+`python3 nsll_bench.py` times every part of a run at n = 10^3, 10^4 and
+10^5, writes the wall time and peak traced memory of every case to
+bench.json and, given --baseline, compares them with an earlier results
+file. `python3 nsll_bench.py betweenness` runs bench_betweenness() and
+`python3 nsll_bench.py gillespie` bench_gillespie(),
+`python3 nsll_bench.py meanfield` bench_meanfield(),
+`python3 nsll_bench.py bits` bench_bits(),
+`python3 nsll_bench.py dynamic` bench_dynamic() and
+`python3 nsll_bench.py graphfile` bench_graphfile().
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import datetime
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+
+import nsll_bits
+import nsll_cache
+import nsll_csr
+import nsll_dynamic
+import nsll_gillespie
+import nsll_graphfile
+import nsll_meanfield
+import nsll_mm
+import nsll_rng
+import nsll_sweep
+
+SIZES = (10 ** 3, 10 ** 4, 10 ** 5)
+# the largest network built with networkx, and with exact betweenness or
+# average path length; larger ones are native and sampled
+NX_NODES = 10 ** 4
+EXACT_NODES = 10 ** 3
+BC_K = 64
+TOLERANCE = 0.25
+
+
+def _i_max_curve(nsll, alphas, replicas, seed=0):
+    """
+    Mean I_max over `replicas` epidemics for every alpha, with common random
+    numbers so that curves of different networks compare point by point
+    """
+    indptr, indices, cb = nsll.arrays()
+    curve = []
+    for a in alphas:
+        counts = nsll_csr.run_batch(indptr, indices, a * cb, 5.2 * cb,
+                                    nsll.i_0, nsll.r_0, 250, replicas,
+                                    np.random.RandomState(seed))
+        curve.append(counts['i'].max(axis=1).mean())
+    return np.array(curve)
+
+
+def bench_betweenness(ks=(50, 100, 200, 500), tols=(0.1, 0.05, 0.02),
+                      alphas=np.linspace(1.9, 5.1, 9), replicas=200):
+    """
+    Compares sampled betweenness with the exact one at n=1000: the time, the
+    relative L1 error of the weights clustering * betweenness and of the
+    mean I_max curve over alpha.
+
+    The `noise` row reruns the exact curve with other random numbers, so it
+    is the Monte Carlo floor of the I_max column.
+    """
+    exact = nsll_mm.nsll_nw(engine='array')
+    cb = exact.arrays()[2]
+    t = time.time()
+    nsll_csr.betweenness(exact.indptr, exact.indices)
+    seconds = time.time() - t
+    i_max = _i_max_curve(exact, alphas, replicas)
+    noise = _i_max_curve(exact, alphas, replicas, seed=1)
+    rows = [dict(mode='exact', sources=exact.bc_sources, error=0.0,
+                 seconds=seconds, weights=0.0, i_max=0.0),
+            dict(mode='noise', sources=exact.bc_sources, error=0.0,
+                 seconds=seconds, weights=0.0,
+                 i_max=np.abs(noise - i_max).sum() / i_max.sum())]
+    runs = [('k=%d' % k, dict(bc_k=k)) for k in ks]
+    runs += [('tol=%g' % tol, dict(bc_tol=tol)) for tol in tols]
+    for mode, kwargs in runs:
+        t = time.time()
+        nsll_csr.betweenness(exact.indptr, exact.indices, k=kwargs.get('bc_k'),
+                             tol=kwargs.get('bc_tol'), seed='nsll')
+        seconds = time.time() - t
+        approx = nsll_mm.nsll_nw(engine='array', **kwargs)
+        rows.append(dict(
+            mode=mode,
+            sources=approx.bc_sources,
+            error=approx.bc_error,
+            seconds=seconds,
+            weights=np.abs(approx.arrays()[2] - cb).sum() / cb.sum(),
+            i_max=(np.abs(_i_max_curve(approx, alphas, replicas) - i_max)
+                   .sum() / i_max.sum()),
+        ))
+    header = ('mode', 'sources', 'est. err', 'seconds', 'weights', 'I_max')
+    print('%-10s %8s %10s %9s %10s %8s' % header)
+    for row in rows:
+        print('%(mode)-10s %(sources)8d %(error)10.4f %(seconds)9.3f '
+              '%(weights)10.4f %(i_max)8.4f' % row)
+    return rows
+
+
+def bench_gillespie(points=((3.9, 5.2), (5.1, 5.2), (3.9, 8.4)),
+                    replicas=50, steps=250):
+    """
+    Compares the event-driven nsll_gillespie engine with the discrete array
+    engine, one epidemic at a time, at every (alpha, beta) in points: the
+    seconds per epidemic, the mean peak of I and its time, the mean final R
+    and the relative L1 distance between the mean I curves.
+
+    Replica r of both engines starts from the I and R nodes nsll_nw draws
+    with stream (1, r) and goes on with that stream. The `noise` column is
+    the distance between two discrete runs with other random streams, the
+    Monte Carlo floor of the comparison.
+    """
+    rows = []
+    for a, b in points:
+        curves = {}
+        seconds = {}
+        for engine, seed in (('discrete', 1), ('noise', 2), ('event', 1)):
+            t = time.time()
+            if engine == 'event':
+                runs = [nsll_gillespie.run(
+                    nsll_mm.nsll_nw(engine='array', rng=(seed, r)), a, b,
+                    steps) for r in range(replicas)]
+            else:
+                runs = [nsll_mm.nsll_nw(engine='array', rng=(seed, r))
+                        .run(a, b, steps) for r in range(replicas)]
+            seconds[engine] = (time.time() - t) / replicas
+            curves[engine] = dict((c, np.mean([run[c] for run in runs],
+                                              axis=0)) for c in 'ir')
+        i_mean = curves['discrete']['i']
+        for engine in ('discrete', 'event'):
+            i_curve = curves[engine]['i']
+            rows.append(dict(
+                alpha=a, beta=b, engine=engine, seconds=seconds[engine],
+                i_max=i_curve.max(), peak=i_curve.argmax(),
+                r_end=curves[engine]['r'][-1],
+                l1=np.abs(i_curve - i_mean).sum() / i_mean.sum(),
+                noise=np.abs(curves['noise']['i'] - i_mean).sum() /
+                i_mean.sum(),
+            ))
+    print('%5s %5s %-9s %9s %8s %5s %7s %7s %7s' % (
+        'alpha', 'beta', 'engine', 's/run', 'I_max', 'peak', 'R_end', 'L1',
+        'noise'))
+    for row in rows:
+        print('%(alpha)5.1f %(beta)5.1f %(engine)-9s %(seconds)9.4f '
+              '%(i_max)8.1f %(peak)5d %(r_end)7.1f %(l1)7.3f %(noise)7.3f'
+              % row)
+    return rows
+
+
+def _ranks(x):
+    """
+    The ranks of the values of x, 0 for the smallest
+    """
+    ranks = np.empty(len(x))
+    ranks[np.argsort(x, kind='stable')] = np.arange(len(x))
+    return ranks
+
+
+def bench_meanfield(alphas=np.linspace(1.9, 5.1, 5), betas=(5.2, 6.8, 8.4),
+                    replicas=50, steps=250, workers=None):
+    """
+    Compares the nsll_meanfield surrogate with simulated sweeps over the
+    (alpha, beta) grid: the mean peak of I and its time, the mean final R
+    and the relative L1 distance between the mean I curves at every point,
+    then the seconds of the surrogate and of the sweep, the median relative
+    error of I_max and the rank correlation of I_max over the grid, which
+    is what matters when the surrogate screens the grid for a sweep.
+
+    The `noise` column is the L1 distance between two sweeps with other
+    random streams, the Monte Carlo floor of the comparison.
+    """
+    nsll = nsll_mm.nsll_nw(engine='array')
+    points = [(float(a), float(b)) for a in alphas for b in betas]
+    t = time.time()
+    mean_field = nsll_meanfield.solve(nsll, points, steps)
+    seconds = time.time() - t
+    t = time.time()
+    sims = [nsll_sweep.sweep(nsll, points, replicas, steps, rng_seed=seed,
+                             workers=workers, trajectories=True)
+            for seed in (0, 1)]
+    sweep_seconds = (time.time() - t) / 2
+    rows = []
+    for point, (a, b) in enumerate(points):
+        index = slice(point * replicas, (point + 1) * replicas)
+        i_sim = sims[0]['i'][index].mean(axis=0)
+        i_noise = sims[1]['i'][index].mean(axis=0)
+        i_mf = mean_field['i'][point]
+        rows.append(dict(
+            alpha=a, beta=b,
+            i_max=i_sim.max(), i_max_mf=i_mf.max(),
+            peak=i_sim.argmax(), peak_mf=i_mf.argmax(),
+            r_end=sims[0]['r'][index, -1].mean(),
+            r_end_mf=mean_field['r'][point, -1],
+            l1=np.abs(i_mf - i_sim).sum() / i_sim.sum(),
+            noise=np.abs(i_noise - i_sim).sum() / i_sim.sum(),
+        ))
+    print('%5s %5s %7s %7s %5s %5s %7s %7s %7s %7s' % (
+        'alpha', 'beta', 'I_max', 'mf', 'peak', 'mf', 'R_end', 'mf', 'L1',
+        'noise'))
+    for row in rows:
+        print('%(alpha)5.1f %(beta)5.1f %(i_max)7.1f %(i_max_mf)7.1f '
+              '%(peak)5d %(peak_mf)5d %(r_end)7.1f %(r_end_mf)7.1f '
+              '%(l1)7.3f %(noise)7.3f' % row)
+    i_max = np.array([row['i_max'] for row in rows])
+    i_max_mf = np.array([row['i_max_mf'] for row in rows])
+    summary = dict(
+        seconds=seconds, sweep_seconds=sweep_seconds,
+        i_max_error=float(np.median(np.abs(i_max_mf - i_max) / i_max)),
+        rank=float(np.corrcoef(_ranks(i_max), _ranks(i_max_mf))[0, 1]),
+    )
+    print('surrogate %(seconds).3fs, sweep %(sweep_seconds).1fs, median '
+          'I_max error %(i_max_error).3f, rank correlation %(rank).3f'
+          % summary)
+    return rows, summary
+
+
+def bench_bits(points=((3.9, 5.2), (5.1, 5.2), (3.9, 8.4)), replicas=1024,
+               single=32, steps=250):
+    """
+    Compares the bit-sliced nsll_bits engine with nsll_csr.run_batch(), one
+    replica at a time (`single` of them) and all `replicas` at once, at
+    every (alpha, beta) in points: the milliseconds per replica, the peak
+    traced memory per replica besides the (replicas, steps) results, and
+    the mean I_max with its standard error.
+    """
+    nsll = nsll_mm.nsll_nw(engine='array')
+    indptr, indices, cb = nsll.arrays()
+
+    def batch(a, b, seed, k):
+        return nsll_csr.run_batch(indptr, indices, a * cb, b * cb, nsll.i_0,
+                                  nsll.r_0, steps, k,
+                                  nsll_rng.spawn(nsll_rng.stream(seed), k))
+
+    def bits(a, b, seed, k):
+        return nsll_bits.run_bits(indptr, indices, a * cb, b * cb, nsll.i_0,
+                                  nsll.r_0, steps, k, nsll_rng.stream(seed))
+
+    rows = []
+    for a, b in points:
+        for engine, run, calls, k in (('single', batch, single, 1),
+                                      ('batch', batch, 1, replicas),
+                                      ('bits', bits, 1, replicas)):
+            t = time.time()
+            out = [run(a, b, call + 1, k) for call in range(calls)]
+            seconds = time.time() - t
+            tracemalloc.start()
+            run(a, b, 0, k)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            i_max = np.concatenate([sir['i'].max(axis=1) for sir in out])
+            rows.append(dict(
+                alpha=a, beta=b, engine=engine,
+                ms=1000 * seconds / (calls * k),
+                # less the (4, k, steps) int64 results
+                kb=max(peak - 32 * k * steps, 0) / k / 1024,
+                i_max=i_max.mean(), se=i_max.std() / np.sqrt(i_max.size),
+            ))
+    print('%5s %5s %-7s %9s %9s %8s %6s' % ('alpha', 'beta', 'engine',
+                                            'ms/rep', 'KB/rep', 'I_max',
+                                            'se'))
+    for row in rows:
+        print('%(alpha)5.1f %(beta)5.1f %(engine)-7s %(ms)9.3f %(kb)9.2f '
+              '%(i_max)8.1f %(se)6.1f' % row)
+    return rows
+
+
+def bench_dynamic(stales=(0, 4, 9, 19), rewires=5, steps=40, check=8,
+                  n=1000):
+    """
+    Rewires `rewires` random edges before each of `steps` steps and
+    compares the nsll_dynamic.DynamicGraph refresh, for every max_stale in
+    stales, with computing the clustering and betweenness from scratch:
+    the seconds per step, the share of BFS sources recomputed and the
+    relative L1 error of the betweenness every `check` steps.
+    """
+    indptr, indices = nsll_csr.watts_strogatz(n, 10, 0.02947368, 0)
+    t = time.time()
+    nsll_csr.clustering(indptr, indices)
+    nsll_csr.betweenness(indptr, indices)
+    full = time.time() - t
+    rows = []
+    for max_stale in stales:
+        graph = nsll_dynamic.DynamicGraph(indptr, indices,
+                                          max_stale=max_stale)
+        rng = np.random.RandomState(0)
+        seconds = 0.0
+        errors = []
+        for step in range(steps):
+            t = time.time()
+            graph.rewire(rewires, rng)
+            graph.refresh()
+            seconds += time.time() - t
+            if (step + 1) % check == 0:
+                exact = nsll_csr.betweenness(*graph.csr())[0]
+                errors.append(np.abs(graph.betweenness - exact).sum() /
+                              exact.sum())
+        rows.append(dict(max_stale=max_stale, seconds=seconds / steps,
+                         share=100.0 * graph.recomputed / (steps * n),
+                         error=np.mean(errors), worst=np.max(errors)))
+    print('from scratch: %.3f s/step' % full)
+    print('%9s %8s %8s %8s %8s' % ('max_stale', 's/step', 'sources',
+                                   'error', 'worst'))
+    for row in rows:
+        print('%(max_stale)9d %(seconds)8.3f %(share)7.1f%% %(error)8.3f '
+              '%(worst)8.3f' % row)
+    return dict(full=full, rows=rows)
+
+
+def _open_network(job):
+    """
+    A bench_graphfile() worker: builds the nsll_nw of job and touches its
+    arrays. Returns the seconds it took and the peak and kept memory a
+    second build allocates, traced, in bytes (a mapped file is not
+    allocated)
+    """
+    n, bc_k, generator, graph_file = job
+
+    def build():
+        nsll_cache.forget()
+        nsll = nsll_mm.nsll_nw(n=n, engine='array', generator=generator,
+                               bc_k=bc_k, graph_file=graph_file)
+        indptr, indices, cb = nsll.arrays()
+        float(cb.sum() + indices.sum() + indptr[-1])
+        nsll_cache.forget()
+        return nsll
+
+    t = time.time()
+    build()
+    seconds = time.time() - t
+    tracemalloc.start()
+    nsll = build()
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del nsll
+    return seconds, peak, kept
+
+
+def bench_graphfile(n=2 * 10 ** 5, bc_k=16, workers=4):
+    """
+    Builds the nsll_nw of a network of n nodes (betweenness from bc_k
+    sources) in `workers` processes at once: from the networkx graph of
+    the cache, from the CSR arrays of the cache ('native') and mapped from
+    an nsll_graphfile file. Reports the seconds a worker takes, the peak
+    and kept memory it allocates, and the time it takes to map the file
+    alone and to check its checksum.
+    """
+    path = nsll_cache.graph_file(n, 10, 0.02947368, 'nsll', bc_k,
+                                 generator='native')
+    t = time.time()
+    nsll_graphfile.load(path)
+    mapped = time.time() - t
+    t = time.time()
+    nsll_graphfile.load(path, verify=True)
+    verify = time.time() - t
+    rows = []
+    for mode, generator, graph_file in (('networkx', 'networkx', None),
+                                        ('native', 'native', None),
+                                        ('graphfile', 'native', path)):
+        # fill the cache first
+        _open_network((n, bc_k, generator, graph_file))
+        with ProcessPoolExecutor(workers) as pool:
+            out = np.array(list(pool.map(
+                _open_network, [(n, bc_k, generator, graph_file)] * workers,
+                chunksize=1)))
+        rows.append(dict(mode=mode, seconds=out[:, 0].mean(),
+                         peak=out[:, 1].mean() / 2 ** 20,
+                         kept=out[:, 2].mean() / 2 ** 20))
+    print('%.1f MB file: mapped in %.4f s, checksum %.3f s' % (
+        os.path.getsize(path) / 2 ** 20, mapped, verify))
+    print('%-10s %9s %9s %9s' % ('mode', 'seconds', 'peak MB', 'kept MB'))
+    for row in rows:
+        print('%(mode)-10s %(seconds)9.3f %(peak)9.1f %(kept)9.1f' % row)
+    return rows
+
+
+def _measure(case, n, fn, setup=None, **params):
+    """
+    Run fn() with a cold nsll_cache twice: timed, then under tracemalloc for
+    the peak memory, since tracing slows Python code down several times.
+    With setup, each run is fn(setup()) instead, setup() not being
+    measured, so that both start from the same state.
+    Returns the result row and the value of the timed run.
+    """
+    def call(state):
+        return fn() if setup is None else fn(state)
+
+    state = setup() if setup else None
+    nsll_cache.clear()
+    t = time.perf_counter()
+    value = call(state)
+    seconds = time.perf_counter() - t
+    state = setup() if setup else None
+    nsll_cache.clear()
+    tracemalloc.start()
+    call(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    row = dict(case=case, n=n, seconds=seconds, peak_mb=peak / 2 ** 20,
+               params=params)
+    print('%(case)-18s %(n)8d %(seconds)10.3f %(peak_mb)10.1f' % row)
+    return row, value
+
+
+def _cases(n, k=10, p=0.02947368, seed='nsll'):
+    """
+    The benchmark rows of a network of n nodes
+    """
+    generator = 'networkx' if n <= NX_NODES else 'native'
+    bc_k = None if n <= EXACT_NODES else BC_K
+    rows = []
+
+    def measure(case, fn, setup=None, **params):
+        row, value = _measure(case, n, fn, setup, **params)
+        rows.append(row)
+        return value
+
+    # generate, clustering and betweenness time what construct runs at this
+    # n; at networkx sizes the *_native rows are only a comparison
+    native = ''
+    if generator == 'networkx':
+        native = '_native'
+        ws = measure('generate', lambda: nx.watts_strogatz_graph(
+            n, k, p, seed=seed), lib='networkx')
+        measure('clustering', lambda: nx.clustering(ws), lib='networkx')
+        if bc_k is None:
+            measure('betweenness', lambda: nx.betweenness_centrality(ws),
+                    k=bc_k, lib='networkx')
+        else:
+            measure('betweenness', lambda: nsll_csr.betweenness(
+                *nsll_csr.to_csr(ws), k=bc_k, seed=seed), k=bc_k,
+                lib='networkx')
+    indptr, indices = measure('generate' + native,
+                              lambda: nsll_csr.watts_strogatz(n, k, p, seed))
+    measure('clustering' + native,
+            lambda: nsll_csr.clustering(indptr, indices))
+    measure('betweenness' + native, lambda: nsll_csr.betweenness(
+        indptr, indices, k=bc_k, seed=seed), k=bc_k)
+    nsll = measure('construct', lambda: nsll_mm.nsll_nw(
+        n, k, p, seed=seed, engine='array', cache=False, bc_k=bc_k,
+        generator=generator, rng=(0, 0)), generator=generator, bc_k=bc_k)
+    # every step and run starts from a copy of the new nsll
+    measure('step', lambda fresh: (fresh.s_to_i(), fresh.s_i_to_r()),
+            lambda: copy.deepcopy(nsll))
+    measure('run', lambda fresh: fresh.run(), lambda: copy.deepcopy(nsll),
+            steps=250)
+    measure('sweep_point', lambda: nsll_sweep.sweep(
+        nsll, [(3.9, 5.2)], replicas=10, workers=1), replicas=10)
+    tol = None if n <= EXACT_NODES else 0.05
+    measure('find_p', lambda: nsll_mm.find_p(
+        workers=1, n=n, k=k, tol=tol, generator=generator, ao=False),
+        tol=tol, generator=generator)
+    measure('draw_ws_network', lambda: nsll.draw_ws_network(ao=False))
+    return rows
+
+
+def bench_suite(sizes=SIZES, output='bench.json', baseline=None,
+                tolerance=TOLERANCE):
+    """
+    Times graph generation, clustering, betweenness, the construction of a
+    nsll_nw, one step, a 250-step run, a sweep point of 10 replicas, find_p
+    and draw_ws_network for every n in sizes, on one core and with a cold
+    cache, and measures their peak memory in a second, traced run.
+    Networks above NX_NODES are only built natively; up to it, the first
+    three rows time networkx as the construction does, and the native ones
+    are reported as *_native. Above EXACT_NODES the betweenness and path
+    lengths are sampled.
+
+    Writes the rows with the versions and machine to output and returns
+    them; with a baseline file, prints compare() of the two.
+    """
+    print('%-18s %8s %10s %10s' % ('case', 'n', 'seconds', 'peak MB'))
+    rows = []
+    cwd = os.getcwd()
+    cache_dir = nsll_cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        # the pages and the cache files of the cases go to tmp
+        nsll_cache.CACHE_DIR = tmp
+        os.chdir(tmp)
+        try:
+            for n in sizes:
+                rows += _cases(n)
+        finally:
+            os.chdir(cwd)
+            nsll_cache.CACHE_DIR = cache_dir
+    results = dict(
+        date=datetime.datetime.now().isoformat(),
+        machine=dict(python=platform.python_version(),
+                     platform=platform.platform(), cpus=os.cpu_count(),
+                     numpy=np.__version__, networkx=nx.__version__),
+        rows=rows,
+    )
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    if baseline:
+        with open(baseline) as f:
+            compare(results, json.load(f), tolerance)
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Prints the ratios of time and peak memory of every case in results to
+    the same case in baseline, marking those more than tolerance above.
+
+    Returns the regressed (case, n) pairs.
+    """
+    old = dict(((row['case'], row['n']), row) for row in baseline['rows'])
+    regressions = []
+    print('%-18s %8s %10s %10s' % ('case', 'n', 'time', 'memory'))
+    for row in results['rows']:
+        before = old.get((row['case'], row['n']))
+        if before is None:
+            continue
+        ratios = [row[c] / before[c] if before[c] else 1.0
+                  for c in ('seconds', 'peak_mb')]
+        slow = max(ratios) > 1 + tolerance
+        if slow:
+            regressions.append((row['case'], row['n']))
+        print('%-18s %8d %9.2fx %9.2fx%s' % (
+            row['case'], row['n'], ratios[0], ratios[1],
+            '  REGRESSION' if slow else ''))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks of nsll_mm')
+    parser.add_argument('bench', nargs='?', default='suite',
+                        choices=('suite', 'betweenness', 'gillespie',
+                                 'meanfield', 'bits', 'dynamic',
+                                 'graphfile'))
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--output', default='bench.json')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+    if args.bench == 'betweenness':
+        bench_betweenness()
+    elif args.bench == 'gillespie':
+        bench_gillespie()
+    elif args.bench == 'meanfield':
+        bench_meanfield()
+    elif args.bench == 'bits':
+        bench_bits()
+    elif args.bench == 'dynamic':
+        bench_dynamic()
+    elif args.bench == 'graphfile':
+        bench_graphfile()
+    else:
+        bench_suite(args.sizes, args.output, args.baseline, args.tolerance)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+@Version: 1
+@Author: Nasy, SX, LC, LX
+@Date: Jun 12, 2016
+@email: sy_n@me.com
+@file: nsll_bits.py
+@license: MIT
+
+CUFE investment 14 Math Modeling
+
+A bit-sliced engine of the nsll_nw model: 64 replicas per machine word.
+
+Every node has one uint64 word "is I" and one "is R" per 64 replicas, bit
+j of a word being replica j (S is neither). A step is the S -> I sweep,
+then the S, I -> R sweep, as in nsll_csr.run_batch(): along every edge u ->
+v the word of the sources (I or R at u) is ANDed with the word of the
+targets (S, or S or I, at v) and with a random word whose bits are 1 with
+the probability w[u] of u, and the results are ORed into v. A replica
+costs two bits of state per node instead of a byte of state and eight of
+neighbor counts, and one bit of work per edge and step.
+"""
+import numpy as np
+
+import nsll_csr
+import nsll_prof
+
+WORD = 64
+# the words of replicas simulated together
+BLOCK = 4
+
+
+def popcount(words):
+    """
+    The number of 1 bits of every uint64 in words
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words)
+    x = words - ((words >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = ((x & np.uint64(0x3333333333333333)) +
+         ((x >> np.uint64(2)) & np.uint64(0x3333333333333333)))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+def trials(rng, hit, p, log_q):
+    """
+    hit & (a random word whose bits are 1 with probability p) for every
+    uint64 word in hit, where log_q = log(1 - p).
+
+    Only the c 1 bits of a word matter: it has a success with probability
+    1 - (1 - p)^c. For the few that do, the first success among the c bits
+    is drawn from its truncated geometric law, and every later bit has a
+    success with probability p, so the result is exact.
+    """
+    c = popcount(hit).astype(np.int64)
+    some = -np.expm1(c * log_q)
+    u = rng.random(hit.size)
+    live = np.flatnonzero(u < some)
+    out = np.zeros(hit.size, dtype=np.uint64)
+    if not live.size:
+        return out
+    c = c[live]
+    # u / some is uniform given u < some
+    first = np.floor(np.log1p(-u[live]) / log_q[live])
+    first = np.minimum(first, c - 1).astype(np.int64)
+    bits = np.unpackbits(np.ascontiguousarray(hit[live], dtype='<u8')
+                         .view(np.uint8).reshape(-1, 8), axis=1,
+                         bitorder='little')
+    row, place = np.nonzero(bits)
+    starts = np.cumsum(c) - c
+    rank = np.arange(row.size) - np.repeat(starts, c)
+    won = rank == first[row]
+    later = np.flatnonzero(rank > first[row])
+    won[later] = rng.random(later.size) < p[live][row[later]]
+    words = np.where(won, np.left_shift(np.uint64(1), place.astype(np.uint64)),
+                     np.uint64(0))
+    out[live] = np.add.reduceat(words, starts)
+    return out
+
+
+def bit_counts(words, replicas):
+    """
+    The number of nodes of every replica whose bit is set in the (n, words)
+    uint64 array words
+    """
+    rows = np.flatnonzero(words.any(axis=1))
+    if not rows.size:
+        return np.zeros(replicas, dtype=np.int64)
+    bytes_ = np.ascontiguousarray(words[rows], dtype='<u8').view(np.uint8)
+    bits = np.unpackbits(bytes_, axis=1, bitorder='little')
+    return bits.sum(axis=0, dtype=np.int64)[:replicas]
+
+
+def _spread(indptr, indices, source, target, w, log_q, rng):
+    """
+    One sweep of a contact rule: the (n, words) words of the nodes a
+    success reaches, or None if no edge joins a source to a target in any
+    replica. The edges are gathered from the side with fewer live nodes.
+    """
+    sources = np.flatnonzero(source.any(axis=1))
+    targets = np.flatnonzero(target.any(axis=1))
+    if not sources.size or not targets.size:
+        return None
+    if sources.size <= targets.size:
+        u, v = nsll_csr.gather(indptr, indices, sources)
+    else:
+        v, u = nsll_csr.gather(indptr, indices, targets)
+    hit = source[u]
+    hit &= target[v]
+    flat = np.flatnonzero(hit)
+    if not flat.size:
+        return None
+    edge, col = np.divmod(flat, hit.shape[1])
+    u = u[edge]
+    hit = trials(rng, hit.ravel()[flat], w[u], log_q[u])
+    won = np.flatnonzero(hit)
+    out = np.zeros(source.shape, dtype=np.uint64)
+    np.bitwise_or.at(out, (v[edge[won]], col[won]), hit[won])
+    return out
+
+
+def _generator(rng):
+    """
+    rng as a Generator; a legacy RandomState seeds a new one
+    """
+    if isinstance(rng, np.random.RandomState):
+        return np.random.Generator(np.random.Philox(rng.randint(2 ** 32)))
+    return rng
+
+
+def _run_words(indptr, indices, w_a, w_b, i_0, r_0, replicas, rng, counts):
+    """
+    The epidemics of run_bits() for up to BLOCK words of replicas, written
+    into the (4, replicas, steps) counts
+    """
+    n = indptr.size - 1
+    steps = counts.shape[2]
+    words = -(-replicas // WORD)
+    infected = np.zeros((n, words), dtype=np.uint64)
+    rational = np.zeros((n, words), dtype=np.uint64)
+    for state, k in ((infected, i_0), (rational, r_0)):
+        if not k:
+            continue
+        for word in range(words):
+            size = min(WORD, replicas - word * WORD)
+            pick = rng.random((size, n)).argpartition(k - 1, axis=1)[:, :k]
+            bit = np.left_shift(np.uint64(1), np.arange(size, dtype=np.uint64))
+            np.bitwise_or.at(state[:, word], pick, bit[:, None])
+    # a rational drawn on an infected node wins, as in run_batch
+    infected &= ~rational
+    # the bits of the replicas that exist
+    valid = np.full(words, ~np.uint64(0))
+    if replicas % WORD:
+        valid[-1] = np.uint64(2 ** (replicas % WORD) - 1)
+    with np.errstate(divide='ignore'):
+        q_a, q_b = np.log1p(-w_a), np.log1p(-w_b)
+    c_i = bit_counts(infected, replicas)
+    c_r = bit_counts(rational, replicas)
+    for step in range(steps):
+        new_i = _spread(indptr, indices, infected,
+                        ~(infected | rational) & valid, w_a, q_a, rng)
+        if new_i is not None:
+            infected |= new_i
+            c_i += bit_counts(new_i, replicas)
+            counts[3, :, step] = bit_counts(new_i, replicas)
+        new_r = _spread(indptr, indices, rational, ~rational & valid, w_b,
+                        q_b, rng)
+        if new_r is not None:
+            c_i -= bit_counts(new_r & infected, replicas)
+            infected &= ~new_r
+            rational |= new_r
+            c_r += bit_counts(new_r, replicas)
+            counts[3, :, step] += bit_counts(new_r, replicas)
+        if new_i is None and new_r is None:
+            # absorbed: the last counts stand for the remaining steps
+            counts[1, :, step:] = c_i[:, None]
+            counts[2, :, step:] = c_r[:, None]
+            break
+        counts[1, :, step] = c_i
+        counts[2, :, step] = c_r
+        nsll_prof.count('bit_steps', words)
+
+
+@nsll_prof.timed('run_bits')
+def run_bits(indptr, indices, w_a, w_b, i_0, r_0, steps, replicas, rng):
+    """
+    Runs `replicas` independent epidemics as nsll_csr.run_batch() does, 64
+    to a word, each starting from its own i_0 infected and r_0 rationals.
+    BLOCK words are simulated at a time, which bounds the temporary arrays
+    without slowing down a replica. rng is one Generator (or RandomState)
+    for all the replicas.
+
+    Returns {'s': ..., 'i': ..., 'r': ..., 't': ...} with the counts and
+    the number of transitions, all of shape (replicas, steps).
+    """
+    rng = _generator(rng)
+    w_a = np.clip(w_a, 0, 1)
+    w_b = np.clip(w_b, 0, 1)
+    counts = np.zeros((4, replicas, steps), dtype=np.int64)
+    for lo in range(0, replicas, BLOCK * WORD):
+        hi = min(lo + BLOCK * WORD, replicas)
+        _run_words(indptr, indices, w_a, w_b, i_0, r_0, hi - lo, rng,
+                   counts[:, lo:hi])
+    counts[0] = indptr.size - 1
+    counts[0] -= counts[1]
+    counts[0] -= counts[2]
+    return {'s': counts[0], 'i': counts[1], 'r': counts[2], 't': counts[3]}
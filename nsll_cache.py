@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+@Version: 1
+@Author: Nasy, SX, LC, LX
+@Date: Jun 12, 2016
+@email: sy_n@me.com
+@file: nsll_cache.py
+@license: MIT
+
+CUFE investment 14 Math Modeling
+
+Content-addressed cache of WS networks, their centrality and their
+layouts.
+
+Entries are dicts of NumPy arrays keyed by a hash of the generator
+parameters and the library versions. They live in an in-process LRU and in
+.npz files under NSLL_CACHE_DIR (default ~/.cache/nsll), which is kept under
+NSLL_CACHE_MAX bytes (default 512 MB) by evicting the least recently used
+files. graph_file() keeps a network as an nsll_graphfile file there too.
+"""
+from collections import OrderedDict
+import hashlib
+import os
+import random
+import tempfile
+import zipfile
+
+import networkx as nx
+import numpy as np
+
+import nsll_csr
+import nsll_graphfile
+import nsll_prof
+
+CACHE_VERSION = 1
+CACHE_DIR = os.environ.get(
+    'NSLL_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'nsll'))
+CACHE_MAX = int(os.environ.get('NSLL_CACHE_MAX', 512 * 2 ** 20))
+MEMORY_ITEMS = 32
+
+_memory = OrderedDict()
+
+
+def key(*parts):
+    """
+    The cache key of `parts`, together with the library versions
+    """
+    parts = (CACHE_VERSION, nx.__version__, np.__version__) + parts
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def _path(k):
+    return os.path.join(CACHE_DIR, k + '.npz')
+
+
+def load(k):
+    """
+    The arrays stored under key k, or None
+    """
+    if k in _memory:
+        _memory.move_to_end(k)
+        return _memory[k]
+    path = _path(k)
+    try:
+        with np.load(path) as npz:
+            arrays = dict(npz.items())
+        os.utime(path)
+    except (IOError, OSError):
+        return None
+    except (ValueError, EOFError, KeyError, zipfile.BadZipFile):
+        # damaged or not ours: a miss, and store() writes it again
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    _remember(k, arrays)
+    return arrays
+
+
+def store(k, arrays):
+    """
+    Store a dict of arrays under key k, in memory and on disk
+    """
+    _remember(k, arrays)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # not .npz until it is complete, so that evict() leaves it alone
+        fd, tmp = tempfile.mkstemp(suffix='.npz.tmp', dir=CACHE_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, _path(k))
+    except (IOError, OSError):
+        return
+    evict(keep=(_path(k),))
+
+
+def cached(parts, build):
+    """
+    The arrays stored under key(*parts), calling build() to make them on a
+    miss
+    """
+    k = key(*parts)
+    arrays = load(k)
+    if arrays is None:
+        nsll_prof.count('cache_misses')
+        arrays = build()
+        with nsll_prof.phase('cache_store'):
+            store(k, arrays)
+    else:
+        nsll_prof.count('cache_hits')
+    return arrays
+
+
+def evict(limit=None, keep=()):
+    """
+    Remove the least recently used files until the disk cache fits in limit
+    bytes (default CACHE_MAX). The paths in keep, such as the entry just
+    written, are never removed, nor are the temporary files being written.
+    """
+    limit = CACHE_MAX if limit is None else limit
+    try:
+        names = [os.path.join(CACHE_DIR, f) for f in os.listdir(CACHE_DIR)
+                 if f.endswith(('.npz', '.nsg'))]
+        files = sorted((st.st_mtime, st.st_size, f)
+                       for st, f in ((os.stat(f), f) for f in names))
+    except (IOError, OSError):
+        return
+    total = sum(size for __, size, __ in files)
+    for __, size, f in files:
+        if total <= limit:
+            break
+        if f in keep:
+            continue
+        try:
+            os.remove(f)
+        except OSError:
+            continue
+        total -= size
+
+
+def forget():
+    """
+    Empty the in-process layer, so that the next load() reads the disk
+    """
+    _memory.clear()
+
+
+def clear():
+    """
+    Empty both cache layers
+    """
+    forget()
+    evict(0)
+
+
+def _remember(k, arrays):
+    _memory[k] = arrays
+    _memory.move_to_end(k)
+    while len(_memory) > MEMORY_ITEMS:
+        _memory.popitem(last=False)
+
+
+def ws_graph(n, k, p, seed, bc_k=None, bc_tol=None, generator='networkx'):
+    """
+    The WS Small-World network nx.watts_strogatz_graph(n, k, p, seed) with
+    its clustering and betweenness, as arrays:
+        edges: (m, 2) int32 edge list
+        clustering, betweenness: float64 per node
+        bc_sources, bc_error: the BFS sources and estimated relative error
+                              of betweenness, see nsll_csr.betweenness
+        random_state: the state `random` is left in by the generator, if it
+                      touches the global generator (networkx 1.x reseeds it)
+
+    With generator='native' the network is nsll_csr.watts_strogatz(n, k, p,
+    seed) instead, stored as its CSR arrays indptr and indices in place of
+    edges, and no networkx graph is built.
+    """
+    def build():
+        before = random.getstate()
+        with nsll_prof.phase('generate'):
+            ws = nx.watts_strogatz_graph(n, k, p, seed=seed)
+        after = random.getstate()
+        with nsll_prof.phase('clustering'):
+            clustering = nx.clustering(ws)
+        if bc_k is None and bc_tol is None:
+            with nsll_prof.phase('betweenness'):
+                betweenness = nx.betweenness_centrality(ws)
+            betweenness = np.array([betweenness[u] for u in range(n)])
+            sources, error = n, 0.0
+        else:
+            indptr, indices = nsll_csr.to_csr(ws)
+            betweenness, sources, error = nsll_csr.betweenness(
+                indptr, indices, k=bc_k, tol=bc_tol, seed=seed)
+        arrays = dict(
+            edges=np.array(list(ws.edges()), dtype=np.int32).reshape(-1, 2),
+            clustering=np.array([clustering[u] for u in range(n)]),
+            betweenness=betweenness,
+            bc_sources=np.array(sources),
+            bc_error=np.array(error),
+        )
+        if after != before and after[2] is None:
+            arrays['random_state'] = np.array(after[1], dtype=np.int64)
+        return arrays
+
+    def native():
+        indptr, indices = nsll_csr.watts_strogatz(n, k, p, seed)
+        betweenness, sources, error = nsll_csr.betweenness(
+            indptr, indices, k=bc_k, tol=bc_tol, seed=seed)
+        return dict(
+            indptr=indptr,
+            indices=indices,
+            clustering=nsll_csr.clustering(indptr, indices),
+            betweenness=betweenness,
+            bc_sources=np.array(sources),
+            bc_error=np.array(error),
+        )
+
+    if generator == 'native':
+        return cached(('ws', 'native', int(n), int(k), float(p), seed, bc_k,
+                       bc_tol), native)
+    arrays = cached(('ws', int(n), int(k), float(p), seed, bc_k, bc_tol),
+                    build)
+    if 'random_state' in arrays:
+        random.setstate((3, tuple(arrays['random_state'].tolist()), None))
+    return arrays
+
+
+def graph_file(n, k, p, seed, bc_k=None, bc_tol=None, generator='networkx'):
+    """
+    The path of an nsll_graphfile file of the network of ws_graph() with
+    the same arguments, written from it if there is none yet
+    """
+    path = os.path.join(CACHE_DIR, key('graph', int(n), int(k), float(p),
+                                       seed, bc_k, bc_tol, generator) +
+                        '.nsg')
+    if os.path.exists(path):
+        os.utime(path)
+        nsll_prof.count('cache_hits')
+        return path
+    arrays = ws_graph(n, k, p, seed, bc_k, bc_tol, generator)
+    if 'edges' in arrays:
+        indptr, indices = nsll_csr.edges_to_csr(n, arrays['edges'])
+    else:
+        indptr, indices = arrays['indptr'], arrays['indices']
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with nsll_prof.phase('cache_store'):
+        nsll_graphfile.write(path, indptr, indices, arrays['clustering'],
+                             arrays['betweenness'], arrays['bc_sources'],
+                             arrays['bc_error'])
+    evict(keep=(path,))
+    return path
+
+
+def fingerprint(indptr, indices):
+    """
+    A hash of the structure of the graph given as CSR arrays
+    """
+    digest = hashlib.sha1(np.ascontiguousarray(indptr, dtype='<i8'))
+    digest.update(np.ascontiguousarray(indices, dtype='<i4'))
+    return digest.hexdigest()
+
+
+def layout(indptr, indices, method='spring', seed=0, build=None):
+    """
+    The (n, 2) positions of the graph given as CSR arrays, kept under its
+    fingerprint, so a network is drawn the same way every time:
+        method: 'spectral' for nsll_csr.spectral_layout, or a name for the
+                positions build() makes, e.g. 'spring'
+        seed: the seed of the layout
+    """
+    def spectral():
+        return dict(pos=nsll_csr.spectral_layout(indptr, indices, seed=seed))
+
+    def other():
+        return dict(pos=np.asarray(build(), dtype=float))
+
+    return cached(('layout', fingerprint(indptr, indices), method, seed),
+                  spectral if method == 'spectral' else other)['pos']
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+@Version: 1
+@Author: Nasy, SX, LC, LX
+@Date: Jun 12, 2016
+@email: sy_n@me.com
+@file: nsll_gillespie.py
+@license: MIT
+
+CUFE investment 14 Math Modeling
+
+Event-driven, continuous-time engine of the nsll_nw model.
+
+Every I node u infects each S neighbor at rate -ln(1 - a * c_u * b_u), and
+every R node convinces each S or I neighbor at rate -ln(1 - b * c_u * b_u),
+so that in one unit of time an edge fires with the probability a step of
+the discrete model gives it. The per-node rates (edge rate times the
+number of target neighbors) live in a sum tree; each event picks a node in
+O(log n), a target among its neighbors, and updates the rates of the
+target's neighbors. The work is proportional to the number of transitions,
+not to steps * active nodes.
+"""
+import math
+
+import numpy as np
+
+import nsll_csr
+import nsll_prof
+import nsll_rng
+
+# the rate of an edge whose per-step probability is 1 or more
+MAX_RATE = 50.0
+
+
+class RateTree():
+    """
+    A sum tree over the rates of n nodes.
+    ---methods
+    @method update(self, u, rate)
+        This method sets the rate of node u
+    @method total(self)
+        This method returns the sum of all rates
+    @method find(self, x)
+        This method returns the node where the running sum passes x
+    @method rebuild(self)
+        This method sums the rates again from the leaves
+    """
+
+    def __init__(self, rates):
+        """
+        initial the class
+        """
+        size = 1
+        while size < len(rates):
+            size *= 2
+        tree = np.zeros(2 * size)
+        tree[size:size + len(rates)] = rates
+        self.size = size
+        self._sum(tree)
+
+    def _sum(self, tree):
+        size = self.size
+        for level in range(size.bit_length() - 1):
+            lo = size >> (level + 1)
+            tree[lo:2 * lo] = tree[2 * lo:4 * lo:2] + tree[2 * lo + 1:4 * lo:2]
+        self.tree = tree.tolist()
+
+    def rebuild(self):
+        """
+        @method rebuild
+
+        update() adds differences along the path to the root, so the inner
+        sums drift from the leaves by rounding; this recomputes them
+        """
+        self._sum(np.array(self.tree))
+
+    def update(self, u, rate):
+        """
+        @method update
+        """
+        tree = self.tree
+        i = u + self.size
+        delta = rate - tree[i]
+        while i:
+            tree[i] += delta
+            i >>= 1
+
+    def total(self):
+        """
+        @method total
+        """
+        return self.tree[1]
+
+    def find(self, x):
+        """
+        @method find
+        """
+        tree = self.tree
+        i = 1
+        while i < self.size:
+            i *= 2
+            if x >= tree[i] and tree[i + 1] > 0:
+                x -= tree[i]
+                i += 1
+        return i - self.size
+
+
+def edge_rates(w):
+    """
+    Per-edge event rates from per-step probabilities
+    """
+    w = np.clip(w, 0, 1)
+    rates = np.full(w.shape, MAX_RATE)
+    low = w < 1 - math.exp(-MAX_RATE)
+    rates[low] = -np.log1p(-w[low])
+    return rates
+
+
+@nsll_prof.timed('gillespie')
+def simulate(indptr, indices, w_a, w_b, state, steps, rng):
+    """
+    Runs the continuous-time model from `state` (int8 codes, changed in
+    place) until time `steps` or until no event is possible, with per-step
+    probabilities w_a (S -> I) and w_b (S, I -> R) and a random.Random rng.
+
+    Returns {'s': ..., 'i': ..., 'r': ..., 't': ...}: the counts at times
+    1, 2, ..., steps and the number of events in each unit of time.
+    """
+    S, I, R = nsll_csr.S, nsll_csr.I, nsll_csr.R
+    rate_a = edge_rates(w_a).tolist()
+    rate_b = edge_rates(w_b).tolist()
+    n_s = nsll_csr.count_neighbors(indptr, indices, state == S)
+    n_sir = nsll_csr.count_neighbors(indptr, indices, state != R)
+    node = np.where(state == I, edge_rates(w_a) * n_s,
+                    np.where(state == R, edge_rates(w_b) * n_sir, 0.0))
+    tree = RateTree(node)
+    n_s = n_s.tolist()
+    n_sir = n_sir.tolist()
+    ptr = indptr.tolist()
+    nbrs = indices.tolist()
+    codes = state.tolist()
+    counts = [codes.count(S), codes.count(I), codes.count(R)]
+    out = np.zeros((4, steps), dtype=np.int64)
+    t = 0.0
+    tick = 0
+    events = 0
+    # the events until the inner sums of tree are recomputed
+    fresh = tree.size
+
+    def rate(u):
+        if codes[u] == I:
+            return rate_a[u] * n_s[u]
+        if codes[u] == R:
+            return rate_b[u] * n_sir[u]
+        return 0.0
+
+    while tick < steps:
+        total = tree.total()
+        t = t + rng.expovariate(total) if total > 1e-12 else float('inf')
+        while tick < steps and t >= tick + 1:
+            out[:3, tick] = counts
+            out[3, tick] = events
+            events = 0
+            tick += 1
+        if tick >= steps:
+            break
+        u = tree.find(rng.random() * total)
+        if codes[u] == S or rate(u) <= 0:
+            # rounding left a tiny sum over nodes that cannot act
+            tree.update(u, 0.0)
+            tree.rebuild()
+            fresh = tree.size
+            continue
+        targets = (S,) if codes[u] == I else (S, I)
+        pick = [v for v in nbrs[ptr[u]:ptr[u + 1]] if codes[v] in targets]
+        if not pick:
+            # rounding left a tiny rate on a node without targets
+            tree.update(u, 0.0)
+            continue
+        v = pick[int(rng.random() * len(pick))]
+        old = codes[v]
+        new = I if targets == (S,) else R
+        codes[v] = new
+        counts[old] -= 1
+        counts[new] += 1
+        events += 1
+        for x in nbrs[ptr[v]:ptr[v + 1]]:
+            if old == S:
+                n_s[x] -= 1
+            if new == R:
+                n_sir[x] -= 1
+            if codes[x] != S:
+                tree.update(x, rate(x))
+        tree.update(v, rate(v))
+        fresh -= 1
+        if not fresh:
+            tree.rebuild()
+            fresh = tree.size
+    state[:] = codes
+    nsll_prof.count('events', int(out[3].sum()))
+    return {'s': out[0], 'i': out[1], 'r': out[2], 't': out[3]}
+
+
+def run(nsll, a=3.9, b=5.2, steps=250, rng=None):
+    """
+    The continuous-time counterpart of nsll.run(a, b, steps): starts from
+    the current members of the nsll_nw `nsll`, whose network and members are
+    left untouched. rng is a Generator or (seed, stream id) pair as for
+    nsll_nw, default nsll.python_random; drawing from that one advances it
+    (the global `random` module if nsll has no rng), so later runs of nsll
+    change. Pass rng to keep them as they are.
+
+    Returns the counts at times 1 .. steps as simulate() does.
+    """
+    indptr, indices, cb = nsll.arrays()
+    state = np.zeros(indptr.size - 1, dtype=np.int8)
+    state[list(nsll.members['i'])] = nsll_csr.I
+    state[list(nsll.members['r'])] = nsll_csr.R
+    if rng is None:
+        rng = nsll.python_random
+    else:
+        rng = nsll_rng.python_random(nsll_rng.generator(rng))
+    return simulate(indptr, indices, a * cb, b * cb, state, steps, rng)
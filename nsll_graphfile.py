@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+@Version: 1
+@Author: Nasy, SX, LC, LX
+@Date: Jun 12, 2016
+@email: sy_n@me.com
+@file: nsll_graphfile.py
+@license: MIT
+
+CUFE investment 14 Math Modeling
+
+A binary file of a network and its per-node metrics, mapped read-only.
+
+The file is a HEADER-byte header followed by the arrays, each starting at
+a multiple of ALIGN bytes:
+    indptr (int64), indices (int32): the CSR arrays of the network
+    degree (int32): the degree of every node
+    clustering, betweenness, cb (float64): the metrics of every node and
+                                           clustering * betweenness
+The header holds MAGIC, the format version, and a JSON text with its own
+CRC-32: the number of nodes, the dtype, shape and offset of every array,
+the size of the file and the CRC-32 of everything after the header.
+
+load() checks the header and maps the arrays with np.memmap, so opening a
+file costs a few page faults whatever its size, and every process that
+opens it shares the one copy in the page cache. The CRC-32 of the arrays
+is only checked with verify=True, since it reads the whole file.
+"""
+import json
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+
+MAGIC = b'NSLLGRPH'
+FORMAT_VERSION = 1
+HEADER = 4096
+ALIGN = 64
+# the bytes read at a time by the checksum
+CHUNK = 2 ** 24
+# magic, format version, JSON length, JSON CRC-32
+_PREFIX = struct.Struct('<8sIII')
+
+
+def _crc(raw, start=HEADER):
+    """
+    The CRC-32 of the bytes of raw from start on
+    """
+    crc = 0
+    for lo in range(start, raw.size, CHUNK):
+        crc = zlib.crc32(raw[lo:lo + CHUNK], crc)
+    return crc
+
+
+def write(path, indptr, indices, clustering, betweenness, bc_sources=None,
+          bc_error=0.0):
+    """
+    Writes the network given as CSR arrays with the clustering and
+    betweenness of its nodes to the file path, atomically. bc_sources and
+    bc_error are those of nsll_csr.betweenness() (default: exact).
+    """
+    n = indptr.size - 1
+    arrays = (
+        ('indptr', np.ascontiguousarray(indptr, dtype='<i8')),
+        ('indices', np.ascontiguousarray(indices, dtype='<i4')),
+        ('degree', np.diff(indptr).astype('<i4')),
+        ('clustering', np.ascontiguousarray(clustering, dtype='<f8')),
+        ('betweenness', np.ascontiguousarray(betweenness, dtype='<f8')),
+        ('cb', np.multiply(clustering, betweenness).astype('<f8')),
+    )
+    table = {}
+    offset = HEADER
+    for name, array in arrays:
+        table[name] = [array.dtype.str, list(array.shape), offset]
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    crc = 0
+    for name, array in arrays:
+        pad = -array.nbytes % ALIGN
+        crc = zlib.crc32(b'\0' * pad, zlib.crc32(array, crc))
+    meta = json.dumps(dict(
+        n=n, arrays=table, size=offset, crc32=crc,
+        bc_sources=n if bc_sources is None else int(bc_sources),
+        bc_error=float(bc_error),
+    ), sort_keys=True).encode('utf-8')
+    if _PREFIX.size + len(meta) > HEADER:
+        raise ValueError('the header of %s is too long' % (path,))
+    head = _PREFIX.pack(MAGIC, FORMAT_VERSION, len(meta), zlib.crc32(meta))
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(suffix='.nsg.tmp', dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        f.write((head + meta).ljust(HEADER, b'\0'))
+        for __, array in arrays:
+            f.write(array.tobytes())
+            f.write(b'\0' * (-array.nbytes % ALIGN))
+    os.replace(tmp, path)
+
+
+def load(path, verify=False):
+    """
+    The arrays of the file path as read-only views of one np.memmap, with
+    bc_sources and bc_error as 0-d arrays, as nsll_cache.ws_graph() gives
+    them. Raises ValueError if the header is damaged, the file has another
+    size than the header says or, with verify, if the arrays fail their
+    checksum.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(HEADER)
+    if len(head) < HEADER or head[:len(MAGIC)] != MAGIC:
+        raise ValueError('%s is not a graph file' % (path,))
+    __, version, length, crc = _PREFIX.unpack_from(head)
+    if version != FORMAT_VERSION:
+        raise ValueError('unknown graph file version: %r' % (version,))
+    text = head[_PREFIX.size:_PREFIX.size + length]
+    if len(text) != length or zlib.crc32(text) != crc:
+        raise ValueError('the header of %s is damaged' % (path,))
+    meta = json.loads(text.decode('utf-8'))
+    if os.path.getsize(path) != meta['size']:
+        raise ValueError('%s is truncated' % (path,))
+    raw = np.memmap(path, dtype=np.uint8, mode='r')
+    if verify and _crc(raw) != meta['crc32']:
+        raise ValueError('the arrays of %s fail their checksum' % (path,))
+    arrays = dict(
+        (name, np.frombuffer(raw, dtype, int(np.prod(shape)),
+                             offset).reshape(shape))
+        for name, (dtype, shape, offset) in meta['arrays'].items())
+    arrays['bc_sources'] = np.array(meta['bc_sources'])
+    arrays['bc_error'] = np.array(meta['bc_error'])
+    return arrays
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+@Version: 1
+@Author: Nasy, SX, LC, LX
+@Date: Jun 12, 2016
+@email: sy_n@me.com
+@file: nsll_manifest.py
+@license: MIT
+
+CUFE investment 14 Math Modeling
+
+A manifest of the finished work units of an experiment run.
+
+Every unit is recorded under its name with the parameters it was made with
+and the size and modification time of its output files. A unit is up to
+date while its parameters are the same and its outputs are unchanged, so an
+interrupted or repeated run only redoes the units that are missing, stale
+or made with other parameters.
+"""
+import json
+import os
+import tempfile
+
+MANIFEST = 'nsll_manifest.json'
+
+
+def _stat(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class Manifest():
+    """
+    The finished work units, kept in a JSON file.
+    ---parameters
+    @params path, force
+        path: the manifest file. Default: MANIFEST
+        force: treat every unit as out of date. Default: False
+    ---methods
+    @method done(self, unit, params, outputs)
+        This method tells whether unit is up to date
+    @method record(self, unit, params, outputs)
+        This method records that unit has been made
+    @method run(self, unit, params, outputs, make)
+        This method calls make() unless unit is up to date
+    """
+
+    def __init__(self, path=MANIFEST, force=False):
+        """
+        initial the class
+        """
+        self.path = path
+        self.force = force
+        try:
+            with open(path) as f:
+                self.units = json.load(f)
+        except (IOError, OSError, ValueError):
+            self.units = {}
+
+    def done(self, unit, params, outputs):
+        """
+        @method done
+        """
+        entry = self.units.get(unit)
+        if self.force or entry is None:
+            return False
+        if entry['params'] != json.loads(json.dumps(params)):
+            return False
+        if sorted(entry['outputs']) != sorted(outputs):
+            return False
+        try:
+            return all(_stat(path) == entry['outputs'][path]
+                       for path in outputs)
+        except OSError:
+            return False
+
+    def record(self, unit, params, outputs):
+        """
+        @method record
+
+        The manifest is rewritten atomically after every unit
+        """
+        self.units[unit] = dict(params=params, outputs=dict(
+            (path, _stat(path)) for path in outputs))
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(suffix='.json', dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.units, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def run(self, unit, params, outputs, make):
+        """
+        @method run
+
+        Returns whether make() was called
+        """
+        if self.done(unit, params, outputs):
+            print('up to date: %s' % unit)
+            return False
+        print('making: %s' % unit)
+        make()
+        self.record(unit, params, outputs)
+        return True
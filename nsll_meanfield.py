@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+@Version: 1
+@Author: Nasy, SX, LC, LX
+@Date: Jun 12, 2016
+@email: sy_n@me.com
+@file: nsll_meanfield.py
+@license: MIT
+
+CUFE investment 14 Math Modeling
+
+A pair-approximation surrogate of the nsll_nw epidemic.
+
+The expected numbers of S, I and R nodes and of S-I, S-R, ... edges follow
+Keeling's clustered pair approximation: the triples the pair equations need
+are closed with the mean degree and the global clustering of the network,
+so the short loops of the small world slow the spread as they do in the
+simulation. An edge from an I (R) node u fires at the rate
+-ln(1 - a * c_u * b_u) (-ln(1 - b * c_u * b_u)) of nsll_gillespie, averaged
+over the edges, i.e. weighted by degree. All (alpha, beta) points are
+integrated at once as vectors, so a whole grid costs about as much as one
+point.
+
+The surrogate is deterministic and has no front of infection, so it is a
+screening tool: bench_meanfield() in nsll_bench reports how far it is from
+the simulation over a grid.
+"""
+import numpy as np
+
+import nsll_csr
+import nsll_gillespie
+import nsll_prof
+
+# Euler steps per unit of time
+SUBSTEPS = 4
+
+
+def structure(indptr, indices):
+    """
+    The mean degree and the global clustering (transitivity) of a network
+    """
+    deg = np.diff(indptr).astype(np.float64)
+    wedges = deg * (deg - 1)
+    clustering = np.asarray(nsll_csr.clustering(indptr, indices))
+    return deg.mean(), (clustering * wedges).sum() / max(wedges.sum(), 1.0)
+
+
+def edge_rates(indptr, cb, points):
+    """
+    The degree-weighted mean edge rates (tau_a, tau_b) of every
+    (alpha, beta) in points
+    """
+    deg = np.diff(indptr).astype(np.float64)
+    deg /= deg.sum()
+    tau = np.array([[deg.dot(nsll_gillespie.edge_rates(x * cb)) for x in p]
+                    for p in points], dtype=np.float64).reshape(-1, 2)
+    return tau[:, 0], tau[:, 1]
+
+
+def _triples(x, pairs, k, phi):
+    """
+    The closed triples [abc] = (k-1)/k [ab][bc]/[b] * (1 - phi + phi n/k
+    [ac]/([a][c])) as an array t[a, b, c, point]
+    """
+    n = x.sum(axis=0)
+    x = np.maximum(x, 1e-12)
+    ends = (1 - phi) + phi * n / k * pairs / (x[:, None] * x[None])
+    return ((k - 1) / k * pairs[:, :, None] * (pairs / x[:, None])[None] *
+            ends[:, None])
+
+
+@nsll_prof.timed('meanfield')
+def curves(indptr, indices, cb, points, i_0=4, r_0=1, steps=250,
+           substeps=SUBSTEPS):
+    """
+    Integrates the pair approximation for every (alpha, beta) in points,
+    starting from i_0 I and r_0 R nodes placed at random.
+
+    Returns {'s': ..., 'i': ..., 'r': ...}: (points, steps) expected counts
+    at times 1, 2, ..., steps, as the rows of nsll_sweep.sweep().
+    """
+    S, I, R = nsll_csr.S, nsll_csr.I, nsll_csr.R
+    k, phi = structure(indptr, indices)
+    tau_a, tau_b = edge_rates(indptr, cb, points)
+    n = indptr.size - 1
+    x = np.zeros((3, tau_a.size))
+    x[S], x[I], x[R] = n - i_0 - r_0, i_0, r_0
+    pairs = k / n * x[:, None] * x[None]
+    out = np.zeros((3, tau_a.size, steps))
+    dt = 1.0 / substeps
+    for step in range(steps):
+        for _ in range(substeps):
+            t = _triples(x, pairs, k, phi)
+            # the flows of S -> I (by an I), S -> R and I -> R (by an R)
+            si = tau_a * pairs[S, I]
+            sr = tau_b * pairs[S, R]
+            ir = tau_b * pairs[I, R]
+            dx = np.array([-si - sr, si - ir, sr + ir])
+            dp = np.zeros_like(pairs)
+            dp[S, S] = -2 * (tau_a * t[S, S, I] + tau_b * t[S, S, R])
+            dp[S, I] = (tau_a * (t[S, S, I] - t[I, S, I]) - si -
+                        tau_b * (t[R, S, I] + t[S, I, R]))
+            dp[S, R] = (tau_b * (t[S, S, R] - t[R, S, R] + t[S, I, R]) - sr -
+                        tau_a * t[I, S, R])
+            dp[I, I] = 2 * (tau_a * t[I, S, I] + si - tau_b * t[I, I, R])
+            dp[I, R] = (tau_a * t[I, S, R] - ir +
+                        tau_b * (t[R, S, I] + t[I, I, R] - t[R, I, R]))
+            dp[R, R] = 2 * (sr + ir + tau_b * (t[R, S, R] + t[R, I, R]))
+            dp[I, S], dp[R, S], dp[R, I] = dp[S, I], dp[S, R], dp[I, R]
+            x = np.maximum(x + dt * dx, 0)
+            pairs = np.maximum(pairs + dt * dp, 0)
+        out[:, :, step] = x
+    return dict(s=out[S], i=out[I], r=out[R])
+
+
+def solve(nsll, points, steps=250, substeps=SUBSTEPS):
+    """
+    curves() on the network and initial counts of the nsll_nw `nsll`
+    """
+    indptr, indices, cb = nsll.arrays()
+    return curves(indptr, indices, cb, points, nsll.i_0, nsll.r_0, steps,
+                  substeps)
@@ -20,34 +20,109 @@ CUFE investment 14 Math Modeling Final Work by 纳赛阳，盛雪，刘畅 & 刘
 To complete recur the experments, just run `python3 nsll_mm.py` in your command
 line tool like zsh.
 
-This operation may take over 3000s.
+This operation may take over 3000s. A single part can be made with
+`python3 nsll_mm.py find-p|draw-network|sir-prop|sweep-alpha|sweep-beta`;
+finished parts are recorded in nsll_manifest.json and skipped next time
+while their pages are unchanged (--force redoes them).
 """
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
 import random
+import tempfile
 
 import networkx as nx
 import numpy as np
-import plotly.offline as py
+
+import nsll_bits
+import nsll_cache
+import nsll_csr
+import nsll_dynamic
+import nsll_graphfile
+import nsll_manifest
+import nsll_plot
+import nsll_prof
+import nsll_rng
+import nsll_store
+import nsll_sweep
+
+# draw_ws_network: the largest network laid out with nx.spring_layout by
+# default, and the smallest drawn with WebGL traces
+SPRING_NODES = 2000
+WEBGL_NODES = 5000
+CHECKPOINT_VERSION = 2
+# the points of the proportion plots of experment 1 & 2: (name, points,
+# dashboard prefix, axis of the varied parameter)
+EXPERMENTS = (
+    ('1', [(i_1, 5.2) for i_1 in np.linspace(1.9, 5.1, 17)], 'alpha = ', 0),
+    ('2', [(3.9, i_2) for i_2 in np.linspace(5.2, 8.4, 17)], 'beta = ', 1),
+)
 
 
 class nsll_nw():
     """
     This class is the main class of our Final Work.
     ---parameters
-    @params n, k, p, i_0, r_0, seed
+    @params n, k, p, i_0, r_0, seed, engine, generator, rng
         n: nodes of the network. Default: 1000
         k: the average degree of the network. Default: 10
         p: the reconnection chance of the network. Default: 0.02947368
         i_0: the initial infected(I). Default: 4
         r_0: the initial rationals(R). Default: 1
         seed: the WS Small-World network seed
+        engine: 'dict' keeps the states in the networkx node attributes,
+                'array' keeps them in an int8 NumPy array over CSR arrays
+                and draws every trial of a step in one batch.
+                Default: 'dict'
+        cache: reuse the network, clustering and betweenness of an earlier
+               run with the same n, k, p & seed from nsll_cache.
+               Default: True
+        bc_k: estimate the betweenness from bc_k sampled BFS sources instead
+              of computing it exactly. Default: None
+        bc_tol: sample BFS sources until the estimated relative error of the
+                betweenness is below bc_tol. Default: None
+        generator: 'networkx' builds the network with
+                   nx.watts_strogatz_graph, 'native' with
+                   nsll_csr.watts_strogatz straight into CSR arrays, without
+                   a networkx graph unless ws is used. Default: 'networkx'
+        rng: the random stream of the epidemics, a NumPy Generator or a
+             (seed, stream id) pair for nsll_rng.stream(); the dict engine
+             draws from a private random.Random seeded from it. Default:
+             None, the global `random`
+        graph_file: the path of an nsll_graphfile file (see
+                    nsll_cache.graph_file()) to map the network, clustering
+                    and betweenness from, read-only and shared with every
+                    process that maps it; n, k, p, seed and generator are
+                    then ignored. Default: None
     ---attributes
     @attributes ws, s, infected, r
-        ws: the WS Small-World network with n, k & p
+        ws: the WS Small-World network with n, k & p, built on first use
+            with generator='native'
         s: the susceptible nodes. Use method all_s_i_r() to initial it
         infected: the infected nodes
         r: the rationals nodes
+        members: the sets of S, I & R nodes under keys 's', 'i' & 'r', kept
+                 up to date by every transition
         clustering: the clustering of the network
         betweenness: the centrality betweenness of the network
+                     (both arrays with generator='native')
+        bc_sources, bc_error: the BFS sources behind betweenness and its
+                              estimated relative error
+        state: ('array' engine) the int8 states, see nsll_csr.S, I & R
+        indptr, indices: ('array' engine) the CSR arrays of ws
+        frontier: ('array' engine) the I nodes with S neighbors under 'i'
+                  and the R nodes with S or I neighbors under 'r', the only
+                  nodes s_to_i and s_i_to_r visit
+        graph_file: the file the network is mapped from while its edges
+                    are unchanged, or None
+        graph: ('array' engine) the nsll_dynamic.DynamicGraph behind the
+               clustering and betweenness once edges have changed, or None
+        stop_step: the step the last run() stopped at, or None
+        step: the number of steps so far
+        transitions: the number of state changes so far
+        python_random: the random.Random (or the `random` module) the
+                       dict engine draws from
     ---methods
     @method s_to_i(self, p=3.9)
         This method simulates susceptible to infected one time
@@ -55,89 +130,696 @@ class nsll_nw():
         This method simulates susceptible or infected to rationals one time
     @method all_s_i_r(self)
         This method rebuilds s, infected and r records
-    @method draw_ws_network(self)
+    @method counts(self)
+        This method returns the numbers of S, I & R nodes
+    @method make_dynamic(self, max_stale=0, budget=None)
+        This method lets the edges of the network change
+    @method update_edges(self, removed=(), added=())
+        This method removes and adds edges between two steps
+    @method rewire(self, count=1)
+        This method rewires random edges between two steps
+    @method iter_steps(self, a=3.9, b=5.2, steps=250, stop=True,
+                       checkpoint=None, every=100, rewire=0)
+        This method yields (step, s, i, r, transitions) after every step
+    @method run(self, a=3.9, b=5.2, steps=250, stop=True, checkpoint=None,
+                every=100, rewire=0)
+        This method runs s_to_i and s_i_to_r for some steps
+    @method save(self, path)
+        This method writes the simulation state to a checkpoint file
+    @method restore(cls, path)
+        This classmethod rebuilds a nsll_nw from a checkpoint file
+    @method run_batch(self, a=3.9, b=5.2, steps=250, replicas=100)
+        This method runs independent epidemics on the network all at once
+    @method run_bits(self, a=3.9, b=5.2, steps=250, replicas=1024)
+        This method runs them bit-sliced, 64 to a machine word
+    @method save_graph(self, path)
+        This method writes the network to an nsll_graphfile file
+    @method draw_ws_network(self, layout=None, seed=0, ao=True)
         This method draws the network of WeChat Moments with WS Small-World
     """
 
-    def __init__(self, n=1000, k=10, p=0.02947368, i_0=4, r_0=1, seed='nsll'):
+    def __init__(self, n=1000, k=10, p=0.02947368, i_0=4, r_0=1, seed='nsll',
+                 engine='dict', cache=True, bc_k=None, bc_tol=None,
+                 generator='networkx', rng=None, graph_file=None):
         """
         initial the class
         """
-        self.ws = nx.watts_strogatz_graph(n, k, p, seed=seed)
-        nx.set_node_attributes(self.ws, 'SIR', 'S')
-        self.clustering = nx.clustering(self.ws)
-        self.betweenness = nx.betweenness_centrality(self.ws)
+        if engine not in ('dict', 'array'):
+            raise ValueError('unknown engine: %r' % (engine,))
+        if generator not in ('networkx', 'native'):
+            raise ValueError('unknown generator: %r' % (generator,))
+        self.engine = engine
+        self.i_0 = i_0
+        self.r_0 = r_0
+        self._params = dict(n=n, k=k, p=p, i_0=i_0, r_0=r_0, seed=seed,
+                            engine=engine, cache=cache, bc_k=bc_k,
+                            bc_tol=bc_tol, generator=generator,
+                            graph_file=graph_file)
+        self.indptr = self.indices = self._cb = self._ws = None
+        self.graph = None
+        self.graph_file = graph_file
+        self._mapped = None
+        self._gen = None if rng is None else nsll_rng.generator(rng)
+        self._random = (random if rng is None else
+                        nsll_rng.python_random(self._gen))
+        if graph_file is not None:
+            self._mapped = nsll_graphfile.load(graph_file)
+            self.indptr = self._mapped['indptr']
+            self.indices = self._mapped['indices']
+            self.clustering = self._mapped['clustering']
+            self.betweenness = self._mapped['betweenness']
+            self.bc_sources = int(self._mapped['bc_sources'])
+            self.bc_error = float(self._mapped['bc_error'])
+            n = self.indptr.size - 1
+        elif generator == 'native':
+            if cache and seed is not None:
+                arrays = nsll_cache.ws_graph(n, k, p, seed, bc_k, bc_tol,
+                                             generator)
+                self.indptr = arrays['indptr']
+                self.indices = arrays['indices']
+                self.clustering = arrays['clustering']
+                self.betweenness = arrays['betweenness']
+                self.bc_sources = int(arrays['bc_sources'])
+                self.bc_error = float(arrays['bc_error'])
+            else:
+                self.indptr, self.indices = nsll_csr.watts_strogatz(n, k, p,
+                                                                    seed)
+                self.clustering = nsll_csr.clustering(self.indptr,
+                                                      self.indices)
+                self.betweenness, self.bc_sources, self.bc_error = \
+                    nsll_csr.betweenness(self.indptr, self.indices, k=bc_k,
+                                         tol=bc_tol, seed=seed)
+        elif cache and seed is not None:
+            arrays = nsll_cache.ws_graph(n, k, p, seed, bc_k, bc_tol)
+            self.ws = nx.Graph()
+            self.ws.add_nodes_from(range(n))
+            self.ws.add_edges_from(arrays['edges'].tolist())
+            self.clustering = dict(enumerate(arrays['clustering'].tolist()))
+            self.betweenness = dict(
+                enumerate(arrays['betweenness'].tolist()))
+            self.bc_sources = int(arrays['bc_sources'])
+            self.bc_error = float(arrays['bc_error'])
+        else:
+            with nsll_prof.phase('generate'):
+                self.ws = nx.watts_strogatz_graph(n, k, p, seed=seed)
+            with nsll_prof.phase('clustering'):
+                self.clustering = nx.clustering(self.ws)
+            if bc_k is None and bc_tol is None:
+                with nsll_prof.phase('betweenness'):
+                    self.betweenness = nx.betweenness_centrality(self.ws)
+                self.bc_sources, self.bc_error = n, 0.0
+            else:
+                betweenness, self.bc_sources, self.bc_error = \
+                    nsll_csr.betweenness(*nsll_csr.to_csr(self.ws), k=bc_k,
+                                         tol=bc_tol, seed=seed)
+                self.betweenness = dict(enumerate(betweenness.tolist()))
+        size = n
         self.s = []
-        self.r = random.sample(self.ws.nodes(), r_0)
-        self.infected = random.sample(self.ws.nodes(), i_0)
+        self.r = self._random.sample(range(size), r_0)
+        self.infected = self._random.sample(range(size), i_0)
+
+        self.members = dict(i=set(self.infected) - set(self.r),
+                            r=set(self.r))
+        self.members['s'] = (set(range(size)) - self.members['i'] -
+                             self.members['r'])
+        if self._ws is not None:
+            self._label(self._ws)
+
+        if engine == 'array':
+            self._init_csr()
+            self.state = np.zeros(size, dtype=np.int8)
+            self.state[self.infected] = nsll_csr.I
+            self.state[self.r] = nsll_csr.R
+            self._init_frontier()
+        self.stop_step = None
+        self.step = 0
+        self.transitions = 0
+
+    @property
+    def python_random(self):
+        """
+        The Python generator of the dict engine and of the initial members
+        """
+        return self._random
+
+    @property
+    def ws(self):
+        """
+        The networkx graph of the network; with generator='native' it is
+        only built, from the CSR arrays, when it is first used
+        """
+        if self._ws is None:
+            ws = nx.Graph()
+            ws.add_nodes_from(range(self.indptr.size - 1))
+            owner = np.repeat(np.arange(self.indptr.size - 1),
+                              np.diff(self.indptr))
+            upper = owner < self.indices
+            ws.add_edges_from(zip(owner[upper].tolist(),
+                                  self.indices[upper].tolist()))
+            self._label(ws)
+            self._ws = ws
+        return self._ws
+
+    @ws.setter
+    def ws(self, ws):
+        self._ws = ws
+
+    def _label(self, ws):
+        """
+        Set the 'SIR' attribute of every node of ws from members
+        """
+        nx.set_node_attributes(ws, 'SIR', 'S')
+        for c in 'ir':
+            for n in self.members[c]:
+                ws.node[n]['SIR'] = c.upper()
+
+    def _init_csr(self):
+        """
+        Build the CSR arrays and clustering * betweenness of every node
+        """
+        if self.indptr is None:
+            self.indptr, self.indices = nsll_csr.to_csr(self.ws)
+        size = self.indptr.size - 1
+        if self._mapped is not None:
+            self._cb = self._mapped['cb']
+        elif isinstance(self.clustering, dict):
+            self._cb = np.array([self.clustering[n] * self.betweenness[n]
+                                 for n in range(size)])
+        else:
+            self._cb = self.clustering * self.betweenness
+        self._w = {}
+        if self._gen is None:
+            self._rng = np.random.RandomState(self._random.getrandbits(32))
+        else:
+            self._rng = self._gen
 
-        for n in self.infected:
-            self.ws.node[n]['SIR'] = 'I'
+    def _init_frontier(self):
+        """
+        Count every node's S and non-R neighbors and build the frontier
+        """
+        self.n_s = nsll_csr.count_neighbors(self.indptr, self.indices,
+                                            self.state == nsll_csr.S)
+        self.n_sir = nsll_csr.count_neighbors(self.indptr, self.indices,
+                                              self.state != nsll_csr.R)
+        self.frontier = dict(
+            i=set(np.flatnonzero((self.state == nsll_csr.I) &
+                                 (self.n_s > 0)).tolist()),
+            r=set(np.flatnonzero((self.state == nsll_csr.R) &
+                                 (self.n_sir > 0)).tolist()),
+        )
 
-        for n in self.r:
-            self.ws.node[n]['SIR'] = 'R'
+    def _uncount(self, count, changed, c):
+        """
+        Take the changed nodes out of their neighbors' count and drop the
+        neighbors left with none from frontier[c]
+        """
+        __, nbr = nsll_csr.gather(self.indptr, self.indices, changed)
+        np.subtract.at(count, nbr, 1)
+        self.frontier[c].difference_update(nbr[count[nbr] == 0].tolist())
 
+    def _weights(self, p):
+        """
+        p * clustering * betweenness of every node, computed once per p
+        """
+        if p not in self._w:
+            self._w[p] = p * self._cb
+        return self._w[p]
+
+    def _sources(self, c):
+        """
+        The frontier of state c as a sorted array, so that the draws do not
+        depend on the order of the set
+        """
+        return np.sort(np.fromiter(self.frontier[c], dtype=np.int64,
+                                   count=len(self.frontier[c])))
+
+    def _moved(self, changed, old, new):
+        """
+        Move the nodes `changed` returned by nsll_csr.spread() from their old
+        states' members to state `new`
+        """
+        if not changed.size:
+            return
+        self.transitions += changed.size
+        for code in (nsll_csr.S, nsll_csr.I):
+            self.members['sir'[code]].difference_update(
+                changed[old == code].tolist())
+        self.members[new].update(changed.tolist())
+        if new == 'i':
+            self._uncount(self.n_s, changed, 'i')
+            self.frontier['i'].update(changed[self.n_s[changed] > 0].tolist())
+            return
+        self.frontier['i'].difference_update(
+            changed[old == nsll_csr.I].tolist())
+        self._uncount(self.n_sir, changed, 'r')
+        self._uncount(self.n_s, changed[old == nsll_csr.S], 'i')
+        self.frontier['r'].update(changed[self.n_sir[changed] > 0].tolist())
+
+    @nsll_prof.timed('s_to_i')
     def s_to_i(self, p=3.9):
         """
         @method s_to_i
         """
-        for n in self.infected:
+        if self.engine == 'array':
+            self._moved(*nsll_csr.spread(self.indptr, self.indices,
+                                         self.state, self._sources('i'),
+                                         (nsll_csr.S,), nsll_csr.I,
+                                         self._weights(p), self._rng),
+                        new='i')
+            return
+        for n in sorted(self.members['i']):
             for n2 in self.ws.neighbors(n):
                 if self.ws.node[n2]['SIR'] == 'S':
-                    if random.random() < (p *
-                                          self.clustering[n] *
-                                          self.betweenness[n]):
+                    if self._random.random() < (p *
+                                                self.clustering[n] *
+                                                self.betweenness[n]):
                         self.ws.node[n2]['SIR'] = 'I'
+                        self.members['s'].remove(n2)
+                        self.members['i'].add(n2)
+                        self.transitions += 1
 
+    @nsll_prof.timed('s_i_to_r')
     def s_i_to_r(self, p=5.2):
         """
         @method s_i_to_r
         """
-        for n in self.r:
+        if self.engine == 'array':
+            self._moved(*nsll_csr.spread(self.indptr, self.indices,
+                                         self.state, self._sources('r'),
+                                         (nsll_csr.S, nsll_csr.I), nsll_csr.R,
+                                         self._weights(p), self._rng),
+                        new='r')
+            return
+        for n in sorted(self.members['r']):
             for n2 in self.ws.neighbors(n):
                 if self.ws.node[n2]['SIR'] == 'S':
-                    if random.random() < (p *
-                                          self.clustering[n] *
-                                          self.betweenness[n]):
+                    if self._random.random() < (p *
+                                                self.clustering[n] *
+                                                self.betweenness[n]):
                         self.ws.node[n2]['SIR'] = 'R'
+                        self.members['s'].remove(n2)
+                        self.members['r'].add(n2)
+                        self.transitions += 1
                 elif self.ws.node[n2]['SIR'] == 'I':
-                    if random.random() < (p *
-                                          self.clustering[n] *
-                                          self.betweenness[n]):
+                    if self._random.random() < (p *
+                                                self.clustering[n] *
+                                                self.betweenness[n]):
                         self.ws.node[n2]['SIR'] = 'R'
+                        self.members['i'].remove(n2)
+                        self.members['r'].add(n2)
+                        self.transitions += 1
 
+    @nsll_prof.timed('all_s_i_r')
     def all_s_i_r(self):
         """
         @method all_s_i_r
+
+        Lists the members of every state. Use counts() if only the numbers
+        are needed.
         """
-        self.s = []
-        self.infected = []
-        self.r = []
-        for n in self.ws.node:
-            if self.ws.node[n]['SIR'] == 'S':
-                self.s.append(n)
-            elif self.ws.node[n]['SIR'] == 'I':
-                self.infected.append(n)
-            elif self.ws.node[n]['SIR'] == 'R':
-                self.r.append(n)
+        self.s = sorted(self.members['s'])
+        self.infected = sorted(self.members['i'])
+        self.r = sorted(self.members['r'])
 
         return {'s': self.s, 'i': self.infected, 'r': self.r}
 
-    def draw_ws_network(self):
+    def counts(self):
+        """
+        @method counts
+        """
+        return {'s': len(self.members['s']),
+                'i': len(self.members['i']),
+                'r': len(self.members['r'])}
+
+    def active(self, a=3.9, b=5.2):
+        """
+        @method active
+
+        Whether s_to_i(a) or s_i_to_r(b) can still change any node, that is
+        whether a frontier node has a positive weight
+        """
+        if self.engine != 'array':
+            raise ValueError('active() needs the array engine')
+        return bool((self._weights(a)[self._sources('i')] > 0).any() or
+                    (self._weights(b)[self._sources('r')] > 0).any())
+
+    def make_dynamic(self, max_stale=0, budget=None):
+        """
+        @method make_dynamic
+
+        Builds the nsll_dynamic.DynamicGraph that keeps the clustering and
+        betweenness up to date while edges change, with the BFS sources of
+        the betweenness of this network and the given staleness bound. It
+        costs one computation of the betweenness and 12 n bytes per source;
+        an exact betweenness is kept exact only while all n sources fit in
+        nsll_dynamic.MEMORY, and is sampled beyond. Returns graph.
+        """
+        if self.engine != 'array':
+            raise ValueError('a dynamic network needs the array engine')
+        indptr, indices, __ = self.arrays()
+        size = indptr.size - 1
+        self._base = nsll_cache.fingerprint(indptr, indices)
+        self.graph = nsll_dynamic.DynamicGraph(
+            indptr, indices,
+            sources=self.bc_sources if self.bc_sources < size else None,
+            seed=self._params['seed'], max_stale=max_stale, budget=budget)
+        return self.graph
+
+    def _link(self, u, v, sign):
+        """
+        Count the edge u - v, added (sign 1) or removed (sign -1), in the
+        neighbor counts of its ends and update their frontier membership
+        """
+        for x, y in ((u, v), (v, u)):
+            self.n_s[x] += sign * (self.state[y] == nsll_csr.S)
+            self.n_sir[x] += sign * (self.state[y] != nsll_csr.R)
+            self.frontier['i'].discard(x)
+            self.frontier['r'].discard(x)
+            if self.state[x] == nsll_csr.I and self.n_s[x] > 0:
+                self.frontier['i'].add(x)
+            elif self.state[x] == nsll_csr.R and self.n_sir[x] > 0:
+                self.frontier['r'].add(x)
+
+    def update_edges(self, removed=(), added=()):
+        """
+        @method update_edges
+
+        Removes the edges `removed` and adds `added`, (u, v) pairs, between
+        two steps. The graph (make_dynamic() with its defaults if there is
+        none yet) updates the clustering and betweenness, and with them the
+        weights of the following steps. A bad pair raises ValueError and
+        changes nothing.
+        """
+        if self.graph is None:
+            self.make_dynamic()
+        removed, added = self.graph.update(removed, added)
+        self._changed(removed, added)
+
+    def rewire(self, count=1):
+        """
+        @method rewire
+
+        Moves an end of `count` random edges to random nodes, as the WS
+        model does, drawing from the generator of the array engine; see
+        update_edges(). Returns (removed, added).
+        """
+        if self.graph is None:
+            self.make_dynamic()
+        removed, added = self.graph.rewire(count, self._rng)
+        self._changed(removed, added)
+        return removed, added
+
+    def _changed(self, removed, added):
+        """
+        Bring the neighbor counts, frontier, CSR arrays and weights in line
+        with the edges changed in graph
+        """
+        for u, v in removed:
+            self._link(u, v, -1)
+        for u, v in added:
+            self._link(u, v, 1)
+        self.graph.refresh()
+        self.indptr, self.indices = self.graph.csr()
+        self.clustering = self.graph.clustering
+        self.betweenness = self.graph.betweenness
+        self.bc_error = self.graph.bc_error
+        self._cb = self.clustering * self.betweenness
+        self._w = {}
+        self._ws = None
+        self.graph_file = None
+
+    def iter_steps(self, a=3.9, b=5.2, steps=250, stop=True,
+                   checkpoint=None, every=100, rewire=0):
+        """
+        @method iter_steps
+
+        Runs s_to_i(a) and s_i_to_r(b) `steps` times and yields the record
+        (step, s, i, r, transitions) after each, where s, i & r are counts
+        and transitions the number of nodes that changed in that step. With
+        the array engine and stop, it ends as soon as no transition is
+        possible and records that step in stop_step.
+
+        With a checkpoint path, save() writes it whenever self.step reaches
+        a multiple of `every`. With rewire, rewire(rewire) runs before every
+        step, and stop is ignored since a rewired edge can revive the
+        epidemic.
+        """
+        self.stop_step = None
+        for step in range(steps):
+            if rewire:
+                self.rewire(rewire)
+            elif stop and self.engine == 'array' and not self.active(a, b):
+                self.stop_step = step
+                return
+            before = self.transitions
+            self.s_to_i(a)
+            self.s_i_to_r(b)
+            c = self.counts()
+            self.step += 1
+            if checkpoint is not None and self.step % every == 0:
+                self.save(checkpoint)
+            nsll_prof.count('steps')
+            nsll_prof.count('transitions', self.transitions - before)
+            yield step, c['s'], c['i'], c['r'], self.transitions - before
+
+    def run(self, a=3.9, b=5.2, steps=250, stop=True, checkpoint=None,
+            every=100, rewire=0):
+        """
+        @method run
+
+        Runs iter_steps() and collects its counts; if the run stops early
+        the final counts are repeated to the end. A run resumed from a
+        checkpoint continues with run(a, b, steps - nsll.step, ...).
+
+        Returns {'s': ..., 'i': ..., 'r': ...} with counts of length steps.
+        """
+        counts = np.zeros((3, steps), dtype=np.int64)
+        for record in self.iter_steps(a, b, steps, stop, checkpoint, every,
+                                      rewire):
+            counts[:, record[0]] = record[1:4]
+        if self.stop_step is not None:
+            c = self.counts()
+            counts[:, self.stop_step:] = np.array([[c['s']], [c['i']],
+                                                   [c['r']]])
+
+        return {'s': counts[0], 'i': counts[1], 'r': counts[2]}
+
+    def save(self, path):
+        """
+        @method save
+
+        Writes the simulation state to the checkpoint file path (.npz),
+        atomically: the parameters and fingerprint of the network, the state
+        of every node, the step and transition counters and the state of the
+        random generators. The network itself is rebuilt from its
+        parameters, so it needs a seed or a graph file; a network whose
+        edges changed is saved with its edges and the whole state of its
+        graph as well.
+        """
+        if self._params['seed'] is None and self._params['graph_file'] is None:
+            raise ValueError('a network without seed cannot be restored')
+        indptr, indices = self.indptr, self.indices
+        if indptr is None:
+            indptr, indices = nsll_csr.to_csr(self.ws)
+        if self.engine == 'array':
+            state = self.state
+        else:
+            state = np.zeros(indptr.size - 1, dtype=np.int8)
+            state[list(self.members['i'])] = nsll_csr.I
+            state[list(self.members['r'])] = nsll_csr.R
+        meta = dict(
+            version=CHECKPOINT_VERSION,
+            params=self._params,
+            fingerprint=(nsll_cache.fingerprint(indptr, indices)
+                         if self.graph is None else self._base),
+            step=self.step,
+            transitions=self.transitions,
+            stop_step=self.stop_step,
+            stream=self._gen is not None,
+            random=_to_json(self._random.getstate()),
+        )
+        arrays = {}
+        if self.graph is not None:
+            meta['dynamic'] = dict(bc_error=float(self.bc_error))
+            arrays = dict(('graph_' + name, array)
+                          for name, array in self.graph.state().items())
+            arrays.update(indptr=indptr, indices=indices,
+                          clustering=self.clustering,
+                          betweenness=self.betweenness)
+        if self._cb is not None:
+            meta['rng'] = _to_json(self._rng.bit_generator.state
+                                   if self._gen is not None else
+                                   self._rng.get_state(legacy=False))
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(suffix='.npz', dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, state=state,
+                                meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def restore(cls, path):
+        """
+        @method restore
+
+        The nsll_nw saved in the checkpoint file path, which continues bit
+        for bit as the saved one would have. With the global `random` (no
+        rng) its state is restored too, and so is the graph of a network
+        whose edges changed.
+        """
+        with np.load(path) as npz:
+            state = npz['state']
+            meta = json.loads(str(npz['meta']))
+            arrays = dict((name, npz[name]) for name in npz.files
+                          if name not in ('state', 'meta'))
+        if meta['version'] != CHECKPOINT_VERSION:
+            raise ValueError('unknown checkpoint version: %r' %
+                             (meta['version'],))
+        nsll = cls(rng=(0, 0) if meta['stream'] else None, **meta['params'])
+        indptr, indices = nsll.indptr, nsll.indices
+        if indptr is None:
+            indptr, indices = nsll_csr.to_csr(nsll.ws)
+        if nsll_cache.fingerprint(indptr, indices) != meta['fingerprint']:
+            raise ValueError('the network of %s has changed' % (path,))
+        if 'dynamic' in meta:
+            nsll.arrays()
+            nsll.graph = nsll_dynamic.DynamicGraph.restore(
+                arrays['indptr'], arrays['indices'],
+                dict((name[len('graph_'):], array)
+                     for name, array in arrays.items()
+                     if name.startswith('graph_')))
+            nsll._base = meta['fingerprint']
+            nsll.indptr, nsll.indices = nsll.graph.csr()
+            nsll.clustering = arrays['clustering']
+            nsll.betweenness = arrays['betweenness']
+            nsll.bc_error = meta['dynamic']['bc_error']
+            nsll._cb = nsll.clustering * nsll.betweenness
+            nsll._w = {}
+            nsll._ws = None
+            nsll.graph_file = None
+        nsll.step = meta['step']
+        nsll.transitions = meta['transitions']
+        nsll.stop_step = meta['stop_step']
+        nsll.members = dict((c, set(np.flatnonzero(state == code).tolist()))
+                            for c, code in (('s', nsll_csr.S),
+                                            ('i', nsll_csr.I),
+                                            ('r', nsll_csr.R)))
+        nsll.all_s_i_r()
+        if nsll._ws is not None:
+            nsll._label(nsll._ws)
+        if 'rng' in meta:
+            nsll.arrays()
+            if meta['stream']:
+                nsll._rng.bit_generator.state = _from_json(meta['rng'])
+            else:
+                nsll._rng.set_state(_from_json(meta['rng']))
+        if nsll.engine == 'array':
+            nsll.state = state.copy()
+            nsll._init_frontier()
+        nsll._random.setstate(_from_json(meta['random']))
+        return nsll
+
+    def run_batch(self, a=3.9, b=5.2, steps=250, replicas=100):
+        """
+        @method run_batch
+
+        Runs `replicas` independent epidemics on this network, each with its
+        own i_0 infected and r_0 rationals, as one (replicas, n) state matrix.
+        The state of this object is left untouched. With rng, every replica
+        gets its own stream spawned from it.
+
+        Returns {'s': ..., 'i': ..., 'r': ..., 't': ...} with the counts
+        and the number of transitions, all of shape (replicas, steps).
+        """
+        indptr, indices, cb = self.arrays()
+        rng = self._rng
+        if self._gen is not None:
+            rng = nsll_rng.spawn(self._gen, replicas)
+        return nsll_csr.run_batch(indptr, indices, a * cb, b * cb, self.i_0,
+                                  self.r_0, steps, replicas, rng)
+
+    def run_bits(self, a=3.9, b=5.2, steps=250, replicas=1024):
+        """
+        @method run_bits
+
+        run_batch() with the bit-sliced nsll_bits engine, 64 replicas to a
+        machine word, all drawing from one stream (spawned from rng if
+        given). The state of this object is left untouched.
+        """
+        indptr, indices, cb = self.arrays()
+        rng = self._rng
+        if self._gen is not None:
+            rng = nsll_rng.spawn(self._gen, 1)[0]
+        return nsll_bits.run_bits(indptr, indices, a * cb, b * cb, self.i_0,
+                                  self.r_0, steps, replicas, rng)
+
+    def save_graph(self, path):
+        """
+        @method save_graph
+
+        Writes the network with its clustering and betweenness to the
+        nsll_graphfile file path, which nsll_nw(graph_file=path) maps
+        """
+        indptr, indices, __ = self.arrays()
+        size = indptr.size - 1
+        clustering, betweenness = self.clustering, self.betweenness
+        if isinstance(clustering, dict):
+            clustering = np.array([clustering[u] for u in range(size)])
+            betweenness = np.array([betweenness[u] for u in range(size)])
+        nsll_graphfile.write(path, indptr, indices, clustering, betweenness,
+                             self.bc_sources, self.bc_error)
+
+    def arrays(self):
+        """
+        @method arrays
+
+        The CSR arrays of the network and clustering * betweenness of every
+        node: (indptr, indices, cb)
+        """
+        if self._cb is None:
+            self._init_csr()
+        return self.indptr, self.indices, self._cb
+
+    def draw_ws_network(self, layout=None, seed=0, ao=True):
         """
         @method draw_ws_network
 
         You can simply use it any time you like
 
-        The latest network you draw doesn't look like the the last one
+        layout: 'spring' (nx.spring_layout) or 'spectral' (the approximate
+                nsll_csr.spectral_layout, for large networks). Default:
+                'spring' up to SPRING_NODES nodes
+        seed: the seed of the layout
+        ao: open the page when it is written
+
+        The layout is cached by the fingerprint of the network, so the same
+        network always looks the same
         """
-        ws = self.ws
-        pos = nx.spring_layout(ws)
-        # edges data
+        if self.indptr is None:
+            indptr, indices = nsll_csr.to_csr(self.ws)
+        else:
+            indptr, indices = self.indptr, self.indices
+        size = indptr.size - 1
+        if layout is None:
+            layout = 'spring' if size <= SPRING_NODES else 'spectral'
+
+        def spring():
+            start = np.random.RandomState(seed).random_sample((size, 2))
+            with nsll_prof.phase('layout'):
+                pos = nx.spring_layout(self.ws, pos=dict(enumerate(start)))
+            return [pos[u] for u in range(size)]
+
+        pos = nsll_cache.layout(indptr, indices, layout, seed, spring)
+        kind = 'scattergl' if size >= WEBGL_NODES else 'scatter'
+        # edges data: x0, x1, gap for every edge u < v
+        owner = np.repeat(np.arange(size), np.diff(indptr))
+        upper = owner < indices
+        ends = np.stack((owner[upper], indices[upper]), axis=1)
+        gap = np.full((ends.shape[0], 1), np.nan)
         edge_trace = dict(
-            type='scatter',
-            x=[],
-            y=[],
+            type=kind,
+            x=np.hstack((pos[ends, 0], gap)).ravel(),
+            y=np.hstack((pos[ends, 1], gap)).ravel(),
             line=dict(
                 width=0.1,
                 color='#333',
@@ -145,16 +827,11 @@ class nsll_nw():
             hoverinfo='none',
             mode='lines',
         )
-        for edge in ws.edges():
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
-            edge_trace['x'] += [x0, x1, None]
-            edge_trace['y'] += [y0, y1, None]
         # node data
         node_trace = dict(
-            type='scatter',
-            x=[],
-            y=[],
+            type=kind,
+            x=pos[:, 0],
+            y=pos[:, 1],
             mode='markers',
             hoverinfo='none',
             marker=dict(
@@ -164,12 +841,8 @@ class nsll_nw():
                 )
             ),
         )
-        for node in ws.nodes():
-            x_node, y_node = pos[node]
-            node_trace['x'].append(x_node)
-            node_trace['y'].append(y_node)
         # layout
-        layout = dict(
+        look = dict(
             title='朋友圈 WS network',
             showlegend=False,
             width=900,
@@ -189,44 +862,77 @@ class nsll_nw():
 
         fig = dict(
             data=[edge_trace, node_trace],
-            layout=layout,
+            layout=look,
         )
-        py.plot(fig, filename='ws_network.html')
+        nsll_plot.plot(fig, filename='ws_network.html', auto_open=ao)
         return
 
 
-def find_p():
+def _to_json(value):
+    """
+    A generator state (tuples, dicts, NumPy arrays & ints) as JSON values;
+    arrays become {'array': values, 'dtype': dtype}
+    """
+    if isinstance(value, np.ndarray):
+        return dict(array=value.tolist(), dtype=value.dtype.str)
+    if isinstance(value, dict):
+        return dict((k, _to_json(v)) for k, v in value.items())
+    if isinstance(value, (tuple, list)):
+        return dict(tuple=[_to_json(v) for v in value])
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def _from_json(value):
+    """
+    The inverse of _to_json()
+    """
+    if isinstance(value, dict):
+        if 'array' in value and 'dtype' in value:
+            return np.array(value['array'], dtype=value['dtype'])
+        if 'tuple' in value:
+            return tuple(_from_json(v) for v in value['tuple'])
+        return dict((k, _from_json(v)) for k, v in value.items())
+    return value
+
+
+def find_p(workers=None, n=1000, k=10, tol=None, generator='networkx',
+           ao=True):
     """
     This function is used to find out the 'p' in the WS Small-World we needed.
 
     You have to run this function first and then find out the 'p' in the plot.
 
     All of the orginal data we used in the article are set to default.
+
+    The 20 p values x 5 seeds are computed across `workers` processes
+    (default: all cores). With tol, every average path length is estimated
+    from sampled BFS sources until its 95% confidence interval is narrower
+    than tol, and the plot adds the interval of the average as a band.
+    generator='native' builds the networks with nsll_csr.watts_strogatz.
+    ao: open the plot when it is written
     """
     p = np.linspace(0.02, 0.04, num=20)
+    seeds = ['nsll', 'nsll1', 'nsll2', 'nsll3', 'nsll4']
+    jobs = [(n, k, p_i, seed, tol, generator) for p_i in p for seed in seeds]
+    if workers == 1:
+        lengths = [_path_length(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            lengths = list(pool.map(_path_length, jobs))
     l_max = [0] * 20
     l_min = [0] * 20
     a_l = [0] * 20
-    i = 0
-    for p_i in p:
-        ws = l_ws = [0] * 5
-        ws[0] = nx.watts_strogatz_graph(1000, 10, p_i, seed='nsll')
-        ws[1] = nx.watts_strogatz_graph(1000, 10, p_i, seed='nsll1')
-        ws[2] = nx.watts_strogatz_graph(1000, 10, p_i, seed='nsll2')
-        ws[3] = nx.watts_strogatz_graph(1000, 10, p_i, seed='nsll3')
-        ws[4] = nx.watts_strogatz_graph(1000, 10, p_i, seed='nsll4')
-        l_ws[0] = nx.average_shortest_path_length(ws[0])
-        l_ws[1] = nx.average_shortest_path_length(ws[1])
-        l_ws[2] = nx.average_shortest_path_length(ws[2])
-        l_ws[3] = nx.average_shortest_path_length(ws[3])
-        l_ws[4] = nx.average_shortest_path_length(ws[4])
+    ci = [0] * 20
+    for i in range(20):
+        l_ws = [length for length, __ in lengths[i * 5:i * 5 + 5]]
         # average
         a_l[i] = (l_ws[0] + l_ws[1] + l_ws[2] + l_ws[3] + l_ws[4]) / 5
-        l_max[i] = max(l_ws) - a_l[i]
-        l_min[i] = a_l[i] - min(l_ws)
         l_max[i] = max(l_ws)
         l_min[i] = min(l_ws)
-        i += 1
+        ci[i] = np.sqrt(sum(half ** 2 for __, half in
+                            lengths[i * 5:i * 5 + 5])) / 5
 
     # Draw Figure
     fig = dict(
@@ -268,7 +974,33 @@ def find_p():
                 fill='tonexty',
                 fillcolor='rgba(0,176,246,0.2)',
             ),
-        ],
+        ] + ([] if tol is None else [
+            dict(
+                type='scatter',
+                x=p,
+                y=np.array(a_l) + ci,
+                mode='lines',
+                line=dict(
+                    shape='spline',
+                    width=0,
+                ),
+                name='95% CI',
+                showlegend=False,
+            ),
+            dict(
+                type='scatter',
+                x=p,
+                y=np.array(a_l) - ci,
+                mode='lines',
+                line=dict(
+                    shape='spline',
+                    width=0,
+                ),
+                name='95% CI',
+                fill='tonexty',
+                fillcolor='rgba(246,96,0,0.3)',
+            ),
+        ]),
         layout=dict(
             font=dict(
                 size=24,
@@ -281,27 +1013,78 @@ def find_p():
             ),
         ),
     )
-    py.plot(fig, filename='find_p.html')
+    nsll_plot.plot(fig, filename='find_p.html', auto_open=ao)
     return
 
 
-def draw_sir_prop(a=3.9, b=5.2, text='s_i_r_prop.html', ao=True):
+def _path_length(job):
+    """
+    The average shortest path length of the WS network of a find_p() job,
+    with the half width of its confidence interval
+    """
+    n, k, p_i, seed, tol, generator = job
+    if generator == 'native':
+        csr = nsll_csr.watts_strogatz(n, k, p_i, seed)
+    else:
+        csr = nsll_csr.to_csr(nx.watts_strogatz_graph(n, k, p_i, seed=seed))
+    if tol is None:
+        return nsll_csr.average_path_length(*csr), 0.0
+    length, half, __ = nsll_csr.estimate_path_length(*csr, tol=tol,
+                                                     seed=seed)
+    return length, half
+
+
+def draw_sir_prop(a=3.9, b=5.2, text='s_i_r_prop.html', ao=True,
+                  engine='array', replicas=1, store=None):
     """
     This function draws the susceptible, infected and rationals proportion
+
+    With replicas > 1 it draws the mean of that many epidemics, with their
+    standard deviation as error bars. With the path of an
+    nsll_store.ResultStore as store, the epidemics are those of
+    nsll_sweep.sweep(), taken from the store when they are in it.
+    """
+    nsll = nsll_nw(engine=engine)
+    err = dict(s=None, i=None, r=None)
+    if store is not None:
+        sir = nsll_sweep.sweep(nsll, [(a, b)], replicas, workers=1,
+                               trajectories=True, store=store)
+        s, infected, r = (sir[c].mean(axis=0) for c in 'sir')
+        if replicas > 1:
+            err = dict((c, dict(type='data', array=sir[c].std(axis=0)))
+                       for c in 'sir')
+    elif replicas > 1:
+        sir = nsll.run_batch(a, b, replicas=replicas)
+        s, infected, r = (sir[c].mean(axis=0) for c in 'sir')
+        err = dict((c, dict(type='data', array=sir[c].std(axis=0)))
+                   for c in 'sir')
+    else:
+        sir = nsll.run(a, b)
+        s, infected, r = sir['s'], sir['i'], sir['r']
+    _plot_sir_prop(s, infected, r, text, ao, err)
+
+
+def draw_sir_props(points, texts=None, workers=None, store=None):
+    """
+    This function draws draw_sir_prop() for every (a, b) in points into the
+    file of the same index in texts, running the simulations in parallel.
+
+    It returns the figures, e.g. for nsll_plot.dashboard(); without texts
+    no file is written. store as for draw_sir_prop.
+    """
+    table = nsll_sweep.sweep(nsll_nw(engine='array'), points,
+                             trajectories=True, workers=workers,
+                             store=store)
+    texts = texts or [None] * len(points)
+    return [_plot_sir_prop(table['s'][row], table['i'][row], table['r'][row],
+                           text, False, dict(s=None, i=None, r=None))
+            for row, text in enumerate(texts)]
+
+
+def _plot_sir_prop(s, infected, r, text, ao, err):
+    """
+    Plot the S, I & R curves of draw_sir_prop()
     """
-    nsll = nsll_nw()
-    s = []
-    infected = []
-    r = []
-    # pylint: disable=W0612
-    for __ in range(250):
-        nsll.s_to_i(a)
-        nsll.s_i_to_r(b)
-        sir = nsll.all_s_i_r()
-        s.append(len(sir['s']))
-        infected.append(len(sir['i']))
-        r.append(len(sir['r']))
-    # pylint: enable=W0612
     fig = dict(
         data=[
             dict(
@@ -310,6 +1093,7 @@ def draw_sir_prop(a=3.9, b=5.2, text='s_i_r_prop.html', ao=True):
                 x=np.linspace(0, 500, 501),
                 mode='lines+markers',
                 name='susceptible',
+                error_y=err['s'],
             ),
             dict(
                 type='scatter',
@@ -317,128 +1101,217 @@ def draw_sir_prop(a=3.9, b=5.2, text='s_i_r_prop.html', ao=True):
                 y=infected,
                 mode='lines+markers',
                 name='infected',
+                error_y=err['i'],
             ),
             dict(
                 type='scatter',
                 x=np.linspace(0, 500, 501),
                 y=r,
                 mode='lines+markers',
-                name='rationals'
+                name='rationals',
+                error_y=err['r'],
             )
         ],
         layout=dict(font=dict(size=24)),
     )
-    py.plot(fig, filename=text, auto_open=ao)
+    if text is not None:
+        nsll_plot.plot(fig, filename=text, auto_open=ao)
+    return fig
 
 
-def draw_i_a():
+def draw_i_a(replicas=1, workers=None, ao=True, tol=None, store=None):
     """
     This function draws I_max of the experment 1
 
-    The A_alpha at beginning is 1.9, at stopping is 5.1. Steps is 0.05
+    The A_alpha at beginning is 1.9, at stopping is 5.1. Steps is 0.05.
+    With tol, the sweep is nsll_sweep.adaptive() with that tolerance of the
+    relative standard error of I_max instead, and replicas is ignored.
+    store as for draw_sir_prop.
     """
-    i_max = []
-    for i in np.linspace(1.9, 5.1, 65):
-        nsll = nsll_nw()
-        s = []
-        infected = []
-        r = []
-        # pylint: disable=W0612
-        for __ in range(250):
-            nsll.s_to_i(i)
-            nsll.s_i_to_r()
-            sir = nsll.all_s_i_r()
-            s.append(len(sir['s']))
-            infected.append(len(sir['i']))
-            r.append(len(sir['r']))
-        # pylint: enable=W0612
-
-        print(i)
-        i_max.append(max(infected))
-
-    z = np.polyfit(np.linspace(1.9, 5.1, 65), i_max, 1)
-    f = np.poly1d(z)
-    fig = dict(
-        data=[
-            dict(
-                x=np.linspace(1.9, 5.1, 65),
-                y=i_max,
-                name='I',
-                mode='markers',
-            ),
-            dict(
-                x=np.linspace(1.9, 5.1, 65),
-                y=f(np.linspace(1.9, 5.1, 65)),
-                name='fit',
-                mode='lines',
-            )
-        ],
-        layout=dict(
-            font=dict(
-                size=24
-            )
-        ),
-    )
-    py.plot(fig, filename='i_a.html')
+    _draw_i_max(1.9, 5.1, 5.2, 0, replicas, workers, 'i_a.html', ao, tol,
+                store)
 
 
-def draw_i_b():
+def draw_i_b(replicas=1, workers=None, ao=True, tol=None, store=None):
     """
     This function draws I_max of the experment 2
 
     The A_beta at beginning is 5.2, at stopping is 8.4. Steps is 0.05.
+    tol and store as for draw_i_a.
+    """
+    _draw_i_max(5.2, 8.4, 3.9, 1, replicas, workers, 'i_b.html', ao, tol,
+                store)
+
+
+def _draw_i_max(lo, hi, other, axis, replicas, workers, text, ao=True,
+                tol=None, store=None):
+    """
+    Sweep alpha (axis 0) or beta (axis 1) from lo to hi, then plot I_max
+    against it with a fitted line and its 95% confidence band
     """
-    i_max = []
-    for i in np.linspace(5.2, 8.4, 65):
-        nsll = nsll_nw()
-        s = []
-        infected = []
-        r = []
-        # pylint: disable=W0612
-        for __ in range(250):
-            nsll.s_to_i()
-            nsll.s_i_to_r(i)
-            sir = nsll.all_s_i_r()
-            s.append(len(sir['s']))
-            infected.append(len(sir['i']))
-            r.append(len(sir['r']))
-        # pylint: enable=W0612
-        print(i)
-        i_max.append(max(infected))
-    z = np.polyfit(np.linspace(5.2, 8.4, 65), i_max, 1)
-    f = np.poly1d(z)
+    nsll = nsll_nw(engine='array')
+    if tol is None:
+        x = np.linspace(lo, hi, 65)
+        points = [(i, other) if axis == 0 else (other, i) for i in x]
+        table = nsll_sweep.sweep(nsll, points, replicas, workers=workers,
+                                 store=store)
+        peaks = table['i_max'].reshape(len(points), replicas)
+        i_max = peaks.mean(axis=1)
+        error = peaks.std(axis=1)
+        band = nsll_sweep.fit_band(x, i_max)
+    else:
+        result = nsll_sweep.adaptive(nsll, lo, hi, other, axis, tol,
+                                     workers=workers, store=store)
+        print('adaptive sweep: %d points, %d epidemics' % (
+            result['x'].size, result['simulations']))
+        x, i_max, error = result['x'], result['i_max'], result['se']
+        band = result['fit']
     fig = dict(
         data=[
             dict(
-                x=np.linspace(5.2, 8.4, 65),
+                x=x,
                 y=i_max,
                 name='I',
                 mode='markers',
+                error_y=dict(
+                    type='data',
+                    array=error,
+                    visible=tol is not None or replicas > 1,
+                ),
             ),
             dict(
-                x=np.linspace(5.2, 8.4, 65),
-                y=f(np.linspace(5.2, 8.4, 65)),
+                x=band['x'],
+                y=band['fit'],
                 name='fit',
                 mode='lines',
-            )
+            ),
+            dict(
+                x=band['x'],
+                y=band['upper'],
+                mode='lines',
+                line=dict(width=0),
+                showlegend=False,
+                hoverinfo='skip',
+            ),
+            dict(
+                x=band['x'],
+                y=band['lower'],
+                name='95% band',
+                mode='lines',
+                line=dict(width=0),
+                fill='tonexty',
+            ),
         ],
         layout=dict(font=dict(size=24)),
     )
-    py.plot(fig, filename='i_b.html')
+    nsll_plot.plot(fig, filename=text, auto_open=ao)
+
+
+def _sir_props(manifest, workers, store=None):
+    """
+    The 34 proportion plots of the experments and their dashboard.
+
+    The stream of a point depends on its values only, so only the points of
+    the stale pages are swept, or all of them when the dashboard is stale.
+    """
+    units = []
+    for name, points, __, axis in EXPERMENTS:
+        for a, b in points:
+            text = name + '_' + str((a, b)[axis]) + '.html'
+            units.append(('sir-prop ' + text,
+                          dict(a=float(a), b=float(b)), text))
+    every = [point for __, points, __, __ in EXPERMENTS for point in points]
+    dashboard = ('sir-prop experments.html',
+                 dict(points=[[float(a), float(b)] for a, b in every]),
+                 'experments.html')
+    stale = [unit for unit in units + [dashboard]
+             if not manifest.done(unit[0], unit[1], [unit[2]])]
+    if not stale:
+        print('up to date: sir-prop experments')
+        return
+    todo = [j for j, unit in enumerate(units)
+            if dashboard in stale or unit in stale]
+    figs = draw_sir_props([every[j] for j in todo], workers=workers,
+                          store=store)
+    for j, fig in zip(todo, figs):
+        unit = units[j]
+        if unit in stale:
+            manifest.run(unit[0], unit[1], [unit[2]],
+                         lambda: nsll_plot.plot(fig, filename=unit[2],
+                                                auto_open=False))
+    if dashboard not in stale:
+        return
+    groups = []
+    for name, points, prefix, axis in EXPERMENTS:
+        labels = ['%.1f' % (a, b)[axis] for a, b in points]
+        groups.append((prefix, list(zip(labels, figs[:len(points)]))))
+        figs = figs[len(points):]
+    manifest.run(dashboard[0], dashboard[1], [dashboard[2]],
+                 lambda: nsll_plot.dashboard(groups, filename=dashboard[2],
+                                             title='experments'))
+
+
+def main(argv=None):
+    """
+    The command line: `python3 nsll_mm.py [command] [options]`, see
+    `python3 nsll_mm.py -h`. Work already done with the same parameters is
+    skipped, as recorded in the manifest.
+    """
+    parser = argparse.ArgumentParser(
+        description='CUFE investment 14 Math Modeling experments')
+    parser.add_argument('command', nargs='?', default='all',
+                        choices=('find-p', 'draw-network', 'sir-prop',
+                                 'sweep-alpha', 'sweep-beta', 'all'))
+    parser.add_argument('--workers', type=int,
+                        help='processes of the sweeps. Default: all cores')
+    parser.add_argument('--replicas', type=int, default=1,
+                        help='epidemics per point of the I_max sweeps')
+    parser.add_argument('--tol', type=float,
+                        help='sweep I_max adaptively until its relative '
+                        'standard error is at most TOL; --replicas is '
+                        'ignored')
+    parser.add_argument('--manifest', default=nsll_manifest.MANIFEST)
+    parser.add_argument('--store', default=nsll_store.RESULTS,
+                        help='the database of finished runs the sweeps '
+                        'reuse and add to. Default: %(default)s')
+    parser.add_argument('--no-store', dest='store', action='store_const',
+                        const=None, help='run every epidemic again')
+    parser.add_argument('--force', action='store_true',
+                        help='redo the work even if it is up to date')
+    parser.add_argument('--no-open', dest='ao', action='store_false',
+                        help='do not open the plots')
+    args = parser.parse_args(argv)
+    manifest = nsll_manifest.Manifest(args.manifest, args.force)
+    every = args.command == 'all'
+    if every:
+        print('需要3000s左右整个模拟才能完成，请耐心等待')
+    if every or args.command == 'find-p':
+        # get p
+        manifest.run('find-p', dict(n=1000, k=10), ['find_p.html'],
+                     lambda: find_p(args.workers, ao=args.ao))
+    if every or args.command == 'draw-network':
+        # draw WS Small-World network
+        manifest.run('draw-network', dict(n=1000, k=10, p=0.02947368,
+                                          seed='nsll'), ['ws_network.html'],
+                     lambda: nsll_nw().draw_ws_network(ao=args.ao))
+    if every or args.command == 'sir-prop':
+        # draw susceptible, infected and rationals proportion
+        manifest.run('sir-prop', dict(a=3.9, b=5.2), ['s_i_r_prop.html'],
+                     lambda: draw_sir_prop(3.9, 5.2, ao=args.ao,
+                                           store=args.store))
+        # experment 1 & 2, and all of the proportion curves in one page
+        _sir_props(manifest, args.workers, args.store)
+    if every or args.command == 'sweep-alpha':
+        manifest.run('sweep-alpha', dict(replicas=args.replicas,
+                                         tol=args.tol), ['i_a.html'],
+                     lambda: draw_i_a(args.replicas, args.workers, args.ao,
+                                      args.tol, args.store))
+    if every or args.command == 'sweep-beta':
+        manifest.run('sweep-beta', dict(replicas=args.replicas,
+                                        tol=args.tol), ['i_b.html'],
+                     lambda: draw_i_b(args.replicas, args.workers, args.ao,
+                                      args.tol, args.store))
+
 
 if __name__ == '__main__':
-    print('需要3000s左右整个模拟才能完成，请耐心等待')
-    # get p
-    find_p()
-    # draw WS Small-World network
-    nsll_nw().draw_ws_network()
-    # draw susceptible, infected and rationals proportion
-    draw_sir_prop(3.9, 5.2)
-    # experment 1
-    for i_1 in np.linspace(1.9, 5.1, 17):
-        draw_sir_prop(i_1, 5.2, text='1_' + str(i_1) + '.html', ao=False)
-    draw_i_a()
-    # experment 2
-    for i_2 in np.linspace(5.2, 8.4, 17):
-        draw_sir_prop(3.9, i_2, text='2_' + str(i_2) + '.html', ao=False)
-    draw_i_b()
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+@Version: 1
+@Author: Nasy, SX, LC, LX
+@Date: Jun 12, 2016
+@email: sy_n@me.com
+@file: nsll_plot.py
+@license: MIT
+
+CUFE investment 14 Math Modeling
+
+HTML output of the figures.
+
+plotly.offline.plot embeds the whole plotly.js bundle (over 1 MB) in every
+file. The pages written here carry only their own compact JSON and load
+one shared plotly.min.js next to them, written the first time it is
+needed.
+"""
+import json
+import os
+import webbrowser
+
+import plotly.offline as py
+from plotly.utils import PlotlyJSONEncoder
+
+import nsll_prof
+
+PLOTLY_JS = 'plotly.min.js'
+
+PAGE = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>%(title)s</title>
+<script src="%(js)s"></script>
+</head>
+<body>
+%(body)s
+</body>
+</html>
+'''
+
+DIV = '''<div id="%(id)s" style="width:100%%;height:%(height)s;"></div>
+<script>
+(function () {
+    var fig = %(fig)s;
+    Plotly.newPlot('%(id)s', fig.data, fig.layout);
+})();
+</script>'''
+
+
+def _json(obj):
+    return json.dumps(obj, cls=PlotlyJSONEncoder, separators=(',', ':'),
+                      ensure_ascii=False)
+
+
+def _asset(directory):
+    """
+    Write the shared plotly.js into directory unless it is there
+    """
+    path = os.path.join(directory, PLOTLY_JS)
+    if not os.path.exists(path):
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(py.get_plotlyjs())
+        os.replace(tmp, path)
+
+
+@nsll_prof.timed('write')
+def _write(filename, title, divs, auto_open):
+    """
+    Write a page of divs next to the shared plotly.js
+    """
+    _asset(os.path.dirname(os.path.abspath(filename)))
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(PAGE % dict(title=title, js=PLOTLY_JS, body='\n'.join(divs)))
+    if auto_open:
+        webbrowser.open('file://' + os.path.abspath(filename))
+    return filename
+
+
+@nsll_prof.timed('plot')
+def plot(fig, filename='temp-plot.html', auto_open=True):
+    """
+    Write the figure dict `fig` to filename, like plotly.offline.plot
+    """
+    title = os.path.splitext(os.path.basename(filename))[0]
+    div = DIV % dict(id='plot', height='100vh', fig=_json(fig))
+    return _write(filename, title, [div], auto_open)
+
+
+def slider(figs, prefix=''):
+    """
+    One figure showing one of the (label, fig) pairs in figs at a time,
+    picked with a slider; the layout is the first figure's
+    """
+    data = []
+    owner = []
+    for index, (__, fig) in enumerate(figs):
+        for trace in fig['data']:
+            trace = dict(trace)
+            trace['visible'] = index == 0
+            data.append(trace)
+            owner.append(index)
+    steps = [dict(method='restyle', label=label,
+                  args=['visible', [o == index for o in owner]])
+             for index, (label, __) in enumerate(figs)]
+    layout = dict(figs[0][1].get('layout', {}))
+    layout['sliders'] = [dict(active=0, currentvalue=dict(prefix=prefix),
+                              steps=steps)]
+    return dict(data=data, layout=layout)
+
+
+@nsll_prof.timed('plot')
+def dashboard(groups, filename='dashboard.html', title='dashboard',
+              auto_open=False):
+    """
+    Write one page with a slider figure, see slider(), for every
+    (prefix, figs) pair in groups
+    """
+    divs = [DIV % dict(id='plot%d' % index, height='90vh',
+                       fig=_json(slider(figs, prefix)))
+            for index, (prefix, figs) in enumerate(groups)]
+    return _write(filename, title, divs, auto_open)
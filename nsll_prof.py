@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+@Version: 1
+@Author: Nasy, SX, LC, LX
+@Date: Jun 12, 2016
+@email: sy_n@me.com
+@file: nsll_prof.py
+@license: MIT
+
+CUFE investment 14 Math Modeling
+
+Opt-in phase timers, counters and progress reports.
+
+Set NSLL_PROF=1 to print a summary table of the time spent in every phase
+(graph generation, clustering, betweenness, the steps, all_s_i_r, plotting,
+file writes, ...) and of the counters at exit, and sweep progress with
+steps/s and ETA on stderr; NSLL_PROF=<file>.json writes the summary to that
+file instead of printing it. Unset, timed() returns the function itself and
+phase(), count() and progress() do nothing.
+"""
+import atexit
+from contextlib import contextmanager
+import functools
+import json
+import os
+import sys
+import time
+
+PROF = os.environ.get('NSLL_PROF', '')
+ENABLED = PROF not in ('', '0')
+# seconds between two progress lines
+PROGRESS_EVERY = 1.0
+
+_phases = {}
+_counters = {}
+
+
+class _Null():
+    """
+    The context manager and progress of a disabled profiler
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def update(self, k=1):
+        """
+        @method update
+        """
+
+
+_NULL = _Null()
+
+
+def _add(name, seconds):
+    calls, total = _phases.get(name, (0, 0.0))
+    _phases[name] = (calls + 1, total + seconds)
+
+
+@contextmanager
+def _phase(name):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add(name, time.perf_counter() - t)
+
+
+def phase(name):
+    """
+    A context manager that adds its time to phase `name`
+    """
+    return _phase(name) if ENABLED else _NULL
+
+
+def timed(name):
+    """
+    A decorator that adds the time of every call to phase `name`
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _add(name, time.perf_counter() - t)
+        return wrapper
+    return decorate
+
+
+def count(name, k=1):
+    """
+    Add k to counter `name`
+    """
+    if ENABLED:
+        _counters[name] = _counters.get(name, 0) + k
+
+
+class Progress():
+    """
+    Reports the rate and ETA of `total` units of work on stderr at most
+    every PROGRESS_EVERY seconds, and once when all is done.
+    ---methods
+    @method update(self, k=1)
+        This method records k more units done
+    """
+
+    def __init__(self, total, label='', unit='steps'):
+        """
+        initial the class
+        """
+        self.total = total
+        self.label = label
+        self.unit = unit
+        self.done = 0
+        self.start = self.last = time.perf_counter()
+
+    def update(self, k=1):
+        """
+        @method update
+        """
+        self.done += k
+        now = time.perf_counter()
+        if now - self.last < PROGRESS_EVERY and self.done < self.total:
+            return
+        self.last = now
+        rate = self.done / max(now - self.start, 1e-9)
+        eta = (self.total - self.done) / rate if rate else float('inf')
+        sys.stderr.write('%s %d/%d %s, %.0f %s/s, ETA %.0fs\n' % (
+            self.label, self.done, self.total, self.unit, rate, self.unit,
+            eta))
+
+
+def progress(total, label='', unit='steps'):
+    """
+    A Progress of `total` units, or a no-op when profiling is disabled
+    """
+    return Progress(total, label, unit) if ENABLED else _NULL
+
+
+def summary():
+    """
+    The phases as {name: {'calls', 'seconds'}} and the counters
+    """
+    return dict(
+        phases=dict((name, dict(calls=calls, seconds=seconds))
+                    for name, (calls, seconds) in _phases.items()),
+        counters=dict(_counters),
+    )
+
+
+def take():
+    """
+    summary() of the work since the last take(), or None when profiling is
+    disabled. Pool workers return it with their results, as they exit
+    without running atexit.
+    """
+    if not ENABLED:
+        return None
+    taken = summary()
+    _phases.clear()
+    _counters.clear()
+    return taken
+
+
+def merge(taken):
+    """
+    Add a summary() taken in another process to this one
+    """
+    if not taken:
+        return
+    for name, phase_ in taken['phases'].items():
+        calls, seconds = _phases.get(name, (0, 0.0))
+        _phases[name] = (calls + phase_['calls'],
+                         seconds + phase_['seconds'])
+    for name, value in taken['counters'].items():
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def report(out=None):
+    """
+    Print the summary table to out (default stderr), or write it as JSON to
+    the file NSLL_PROF names if it ends with .json
+    """
+    if PROF.endswith('.json'):
+        with open(PROF, 'w') as f:
+            json.dump(summary(), f, indent=2)
+        return
+    out = out or sys.stderr
+    out.write('%-20s %8s %12s %12s\n' % ('phase', 'calls', 'seconds',
+                                         'ms/call'))
+    for name, (calls, seconds) in sorted(_phases.items(),
+                                         key=lambda item: -item[1][1]):
+        out.write('%-20s %8d %12.3f %12.3f\n' % (name, calls, seconds,
+                                                 1000 * seconds / calls))
+    for name, value in sorted(_counters.items()):
+        out.write('%-20s %8d\n' % (name, value))
+
+
+if ENABLED:
+    atexit.register(report)
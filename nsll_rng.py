@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+@Version: 1
+@Author: Nasy, SX, LC, LX
+@Date: Jun 12, 2016
+@email: sy_n@me.com
+@file: nsll_rng.py
+@license: MIT
+
+CUFE investment 14 Math Modeling
+
+Independent random streams.
+
+A stream is named by a seed and a stream id, a tuple of ints such as
+(point, replica). It is a NumPy Generator over the counter-based Philox bit
+generator keyed by SeedSequence(seed, spawn_key=stream id), so every
+replica, sweep point and worker draws its own numbers and the results do
+not depend on how the work is split.
+"""
+import hashlib
+import random
+
+import numpy as np
+
+
+def _entropy(seed):
+    """
+    An int for the seed; strings, like the network seeds, are hashed
+    """
+    if isinstance(seed, str):
+        seed = seed.encode('utf-8')
+    if isinstance(seed, bytes):
+        return int.from_bytes(hashlib.sha256(seed).digest()[:16], 'little')
+    return int(seed)
+
+
+def stream(seed, stream_id=()):
+    """
+    The Generator of stream stream_id (an int or a tuple of ints) of seed
+    """
+    if not isinstance(stream_id, tuple):
+        stream_id = (stream_id,)
+    return np.random.Generator(np.random.Philox(np.random.SeedSequence(
+        _entropy(seed), spawn_key=tuple(int(s) for s in stream_id))))
+
+
+def generator(rng):
+    """
+    rng as a Generator: a Generator is returned as it is, a pair
+    (seed, stream id) is passed to stream()
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng
+    seed, stream_id = rng
+    return stream(seed, stream_id)
+
+
+def spawn(rng, k):
+    """
+    k independent child Generators of the Generator rng
+    """
+    entropy = rng.integers(2 ** 63, size=4).tolist()
+    return [np.random.Generator(np.random.Philox(child))
+            for child in np.random.SeedSequence(entropy).spawn(k)]
+
+
+def python_random(rng):
+    """
+    A private random.Random seeded from the Generator rng
+    """
+    return random.Random(int(rng.integers(2 ** 63)))
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+@Version: 1
+@Author: Nasy, SX, LC, LX
+@Date: Jun 12, 2016
+@email: sy_n@me.com
+@file: nsll_store.py
+@license: MIT
+
+CUFE investment 14 Math Modeling
+
+On-disk storage of simulation results.
+
+A trajectory store is a directory with one append-only .npy file per
+column (run, step, s, i, r, transitions). Every file has a fixed-size
+header that is rewritten after each chunk, so the rows written so far can
+be opened with np.load(..., mmap_mode='r') at any time, even while a sweep
+is still appending.
+
+A result store is an SQLite database of finished runs, one row per
+replica, keyed by everything the run depends on: the engine version, a
+hash of the network and of its weights, alpha, beta, i_0, r_0, steps, the
+rng seed and the replica, which with alpha and beta gives the stream.
+nsll_sweep reads the runs it needs from it and only computes the missing
+ones. The database is in WAL mode and rows are added with INSERT OR
+IGNORE, so the workers of a sweep and several sweeps at once can write to
+it.
+"""
+import hashlib
+import os
+import sqlite3
+import struct
+import zlib
+
+import numpy as np
+
+COLUMNS = ('run', 'step', 's', 'i', 'r', 'transitions')
+DTYPE = np.dtype('<i4')
+HEADER = 128
+RESULTS = 'nsll_results.sqlite'
+# milliseconds a writer waits for another one to finish
+BUSY_TIMEOUT = 60000
+# the layout of the result store; a database of another one is emptied
+SCHEMA = 2
+# the key columns of a run in a result store, in order
+KEY = ('version', 'network', 'alpha', 'beta', 'i_0', 'r_0', 'steps',
+       'rng_seed')
+
+
+def _header(length):
+    """
+    A .npy version 1.0 header of exactly HEADER bytes for `length` values
+    """
+    text = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (
+        DTYPE.str, length)
+    text = text.ljust(HEADER - 11) + '\n'
+    return (b'\x93NUMPY\x01\x00' + struct.pack('<H', len(text)) +
+            text.encode('latin1'))
+
+
+def _length(f):
+    """
+    The number of values in the .npy file f written by TrajectorySink
+    """
+    np.lib.format.read_magic(f)
+    shape, __, __ = np.lib.format.read_array_header_1_0(f)
+    return shape[0]
+
+
+class TrajectorySink():
+    """
+    Streams (step, s, i, r, transitions) records into a columnar trajectory
+    store in chunks, so memory use does not grow with the number of steps.
+    ---parameters
+    @params path, chunk
+        path: the store directory, created if needed; an existing store is
+              appended to
+        chunk: the number of records buffered between writes.
+               Default: 65536
+    ---methods
+    @method append(self, record, run=0)
+        This method adds one record of run `run`
+    @method extend(self, records, run=0)
+        This method adds every record of an iterable, e.g.
+        nsll_nw.iter_steps()
+    @method flush(self)
+        This method writes the buffered records
+    @method close(self)
+        This method flushes and closes the store
+    """
+
+    def __init__(self, path, chunk=65536):
+        """
+        initial the class
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.length = None
+        self._files = {}
+        for c in COLUMNS:
+            name = os.path.join(path, c + '.npy')
+            if os.path.exists(name):
+                f = open(name, 'r+b')
+                length = _length(f)
+            else:
+                f = open(name, 'w+b')
+                length = 0
+                f.write(_header(0))
+            # the columns may only disagree after a crash between writes;
+            # keep the rows every column has
+            self.length = length if self.length is None else min(
+                self.length, length)
+            self._files[c] = f
+        for f in self._files.values():
+            f.seek(HEADER + self.length * DTYPE.itemsize)
+            f.truncate()
+        self._buffer = np.zeros((len(COLUMNS), chunk), dtype=DTYPE)
+        self._fill = 0
+
+    def append(self, record, run=0):
+        """
+        @method append
+        """
+        self._buffer[0, self._fill] = run
+        self._buffer[1:, self._fill] = record
+        self._fill += 1
+        if self._fill == self._buffer.shape[1]:
+            self.flush()
+
+    def extend(self, records, run=0):
+        """
+        @method extend
+        """
+        for record in records:
+            self.append(record, run)
+
+    def flush(self):
+        """
+        @method flush
+
+        The data of every column is written before its header, so a crash
+        leaves at worst rows that are not yet counted
+        """
+        if not self._fill:
+            return
+        self.length += self._fill
+        for c, column in zip(COLUMNS, self._buffer):
+            f = self._files[c]
+            f.write(column[:self._fill].tobytes())
+            f.flush()
+            f.seek(0)
+            f.write(_header(self.length))
+            f.flush()
+            f.seek(0, os.SEEK_END)
+        self._fill = 0
+
+    def close(self):
+        """
+        @method close
+        """
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_trajectories(path):
+    """
+    The columns of a trajectory store as read-only memory maps
+    """
+    columns = dict((c, np.load(os.path.join(path, c + '.npy'),
+                               mmap_mode='r'))
+                   for c in COLUMNS)
+    length = min(len(column) for column in columns.values())
+    return dict((c, column[:length]) for c, column in columns.items())
+
+
+def network_key(indptr, indices, cb):
+    """
+    A hash of the graph given as CSR arrays and of its weights
+    clustering * betweenness
+    """
+    digest = hashlib.sha1(np.ascontiguousarray(indptr, dtype='<i8'))
+    digest.update(np.ascontiguousarray(indices, dtype='<i4'))
+    digest.update(np.ascontiguousarray(cb, dtype='<f8'))
+    return digest.hexdigest()
+
+
+class ResultStore():
+    """
+    Finished runs in an SQLite database.
+    ---parameters
+    @params path
+        path: the database file, created if needed. Default: RESULTS
+    ---methods
+    @method get(self, key, first, replicas)
+        This method returns the stored runs of replicas first, first + 1, ...
+    @method put(self, key, first, sir)
+        This method stores the runs of replicas first, first + 1, ...
+    @method count(self)
+        This method returns the number of stored runs
+    @method close(self)
+        This method closes the database
+
+    key is a dict with the KEY columns, sir a dict of (replicas, steps)
+    arrays s, i, r and t (transitions) as nsll_csr.run_batch() returns.
+    """
+
+    def __init__(self, path=RESULTS):
+        """
+        initial the class
+        """
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=BUSY_TIMEOUT / 1000)
+        self.db.execute('PRAGMA busy_timeout = %d' % BUSY_TIMEOUT)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        with self.db:
+            schema = self.db.execute('PRAGMA user_version').fetchone()[0]
+            if schema != SCHEMA:
+                # runs keyed by their position in a sweep
+                self.db.execute('DROP TABLE IF EXISTS runs')
+                self.db.execute('PRAGMA user_version = %d' % SCHEMA)
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS runs (version INTEGER, '
+                'network TEXT, alpha REAL, beta REAL, i_0 INTEGER, '
+                'r_0 INTEGER, steps INTEGER, rng_seed INTEGER, '
+                'replica INTEGER, sir BLOB, '
+                'PRIMARY KEY (%s, replica))' % ', '.join(KEY))
+
+    def get(self, key, first, replicas):
+        """
+        @method get
+
+        Returns the sir of the replicas from first on that are stored
+        without a gap, possibly none
+        """
+        rows = self.db.execute(
+            'SELECT replica, sir FROM runs WHERE %s AND replica >= ? AND '
+            'replica < ? ORDER BY replica' % ' AND '.join(
+                c + ' = ?' for c in KEY),
+            [key[c] for c in KEY] + [first, first + replicas])
+        runs = []
+        for replica, blob in rows:
+            if replica != first + len(runs):
+                break
+            runs.append(np.frombuffer(zlib.decompress(blob), dtype=DTYPE)
+                        .reshape(4, key['steps']))
+        runs = np.array(runs, dtype=np.int64).reshape(-1, 4, key['steps'])
+        return dict((c, runs[:, j]) for j, c in enumerate('sirt'))
+
+    def put(self, key, first, sir):
+        """
+        @method put
+        """
+        runs = np.stack([sir[c] for c in 'sirt'], axis=1).astype(DTYPE)
+        with self.db:
+            self.db.executemany(
+                'INSERT OR IGNORE INTO runs VALUES (%s)' % ', '.join(
+                    '?' * (len(KEY) + 2)),
+                [[key[c] for c in KEY] + [first + replica,
+                                          zlib.compress(run.tobytes())]
+                 for replica, run in enumerate(runs)])
+
+    def count(self):
+        """
+        @method count
+        """
+        return self.db.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+
+    def close(self):
+        """
+        @method close
+        """
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
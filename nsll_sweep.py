@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+@Version: 1
+@Author: Nasy, SX, LC, LX
+@Date: Jun 12, 2016
+@email: sy_n@me.com
+@file: nsll_sweep.py
+@license: MIT
+
+CUFE investment 14 Math Modeling
+
+Parameter sweeps over (alpha, beta, replica) on a process pool.
+
+The CSR arrays and clustering * betweenness of the network are published
+once through shared memory, or, for a network mapped from an
+nsll_graphfile file, by the path of the file; every worker maps them
+instead of receiving a pickled copy per task. A job runs every replica
+of one point as a batch. Alpha and beta are rounded to DIGITS decimals,
+and replica r of the point (alpha, beta) draws only from its own stream
+nsll_rng.stream(rng_seed, point_stream(alpha, beta) + (r,)), so the
+results depend on neither the number of workers, nor how the replicas
+are batched, nor where the point is in a sweep: the same point of two
+sweeps is the same epidemics, and is reused from a result store.
+
+adaptive() sweeps one of alpha and beta adaptively: it adds points where
+I_max changes fastest or bends, and replicas at a point only until the
+standard error of its mean I_max is small enough.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+import nsll_csr
+import nsll_graphfile
+import nsll_prof
+import nsll_rng
+import nsll_store
+
+# the z value of the two-sided 95% confidence band of fit_band()
+Z = 1.96
+# the decimals alpha and beta are rounded to
+DIGITS = 6
+
+_shared = {}
+
+
+def _publish(arrays):
+    """
+    Copy arrays into shared memory blocks; returns (blocks, specs)
+    """
+    blocks = []
+    specs = {}
+    for name, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True,
+                                           size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def _mapped(path):
+    """
+    The arrays of _job, mapped read-only from the nsll_graphfile file path
+    """
+    arrays = nsll_graphfile.load(path)
+    return dict((name, arrays[name]) for name in ('indptr', 'indices', 'cb'))
+
+
+def _attach(specs):
+    """
+    Worker initializer: map the published arrays (or graph file) read-only
+    """
+    if isinstance(specs, str):
+        _shared.update(_mapped(specs))
+        return
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype, buffer=block.buf)
+        array.flags.writeable = False
+        _shared[name] = array
+        _shared['_' + name] = block
+
+
+def point_stream(a, b):
+    """
+    The stream id of the point (a, b): its values in units of 10**-DIGITS
+    """
+    return tuple(int(round(x * 10 ** DIGITS)) for x in (a, b))
+
+
+def _job(job):
+    """
+    The replicas of one (alpha, beta) point on the shared network
+    """
+    point, a, b, conf = job
+    first = conf.get('first', 0)
+    rng = [nsll_rng.stream(conf['rng_seed'], point_stream(a, b) + (replica,))
+           for replica in range(first, first + conf['replicas'])]
+    cb = _shared['cb']
+    sir = nsll_csr.run_batch(
+        _shared['indptr'], _shared['indices'], a * cb, b * cb, conf['i_0'],
+        conf['r_0'], conf['steps'], conf['replicas'], rng)
+    if conf.get('store'):
+        with nsll_store.ResultStore(conf['store']) as results:
+            results.put(dict(conf, alpha=a, beta=b), first, sir)
+    return point, sir
+
+
+def _pool_job(job):
+    """
+    _job() in a pool worker, returning the worker's profile of it as well
+    """
+    point, sir = _job(job)
+    return point, sir, nsll_prof.take()
+
+
+def _results(jobs, workers, arrays):
+    """
+    Run the jobs and yield their results in order; arrays is the dict of
+    _job or the path of a graph file holding them
+    """
+    if workers == 1:
+        _shared.update(_mapped(arrays) if isinstance(arrays, str) else
+                       arrays)
+        try:
+            for job in jobs:
+                yield _job(job)
+        finally:
+            _shared.clear()
+        return
+    blocks, specs = [], arrays
+    if not isinstance(arrays, str):
+        blocks, specs = _publish(arrays)
+    try:
+        with ProcessPoolExecutor(workers, initializer=_attach,
+                                 initargs=(specs,)) as pool:
+            chunk = max(1, len(jobs) // (4 * workers))
+            for point, sir, taken in pool.map(_pool_job, jobs,
+                                              chunksize=chunk):
+                nsll_prof.merge(taken)
+                yield point, sir
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _stored(jobs, workers, arrays, store):
+    """
+    The results of the jobs as _results() yields them, except that with an
+    nsll_store.ResultStore path as store the runs already in it are read
+    and only the missing ones are computed (and added to it by the jobs)
+    """
+    if store is None:
+        for result in _results(jobs, workers, arrays):
+            yield result
+        return
+    done = []
+    partial = {}
+    todo = []
+    with nsll_store.ResultStore(store) as results:
+        for point, a, b, conf in jobs:
+            first = conf.get('first', 0)
+            sir = results.get(dict(conf, alpha=a, beta=b), first,
+                              conf['replicas'])
+            have = len(sir['s'])
+            nsll_prof.count('stored_runs', have)
+            if have == conf['replicas']:
+                done.append((point, sir))
+                continue
+            if have:
+                partial[point] = sir
+            todo.append((point, a, b, dict(conf, first=first + have,
+                                           replicas=conf['replicas'] - have)))
+    for result in done:
+        yield result
+    if not todo:
+        return
+    for point, sir in _results(todo, workers, arrays):
+        if point in partial:
+            sir = dict((c, np.concatenate([partial[point][c], sir[c]]))
+                       for c in 'sirt')
+        yield point, sir
+
+
+def _store_conf(conf, store, indptr, indices, cb):
+    """
+    conf with the keys of a run in the result store `store`, if any
+    """
+    if store is None:
+        return conf
+    return dict(conf, store=store, version=nsll_csr.ENGINE_VERSION,
+                network=nsll_store.network_key(indptr, indices, cb))
+
+
+def sweep(nsll, points, replicas=1, steps=250, rng_seed=0, workers=None,
+          trajectories=False, sink=None, store=None):
+    """
+    Runs `replicas` epidemics for every (alpha, beta) in points on the
+    network of the nsll_nw `nsll`, spread across `workers` processes
+    (default: all cores; 1 runs in this process).
+
+    Returns a table as a dict of equally long columns, one row per
+    epidemic in (point, replica) order:
+        alpha, beta, replica: the epidemic
+        i_max, i_max_step: the peak of I and the step it is first reached
+        s_end, i_end, r_end: the counts after the last step
+        s, i, r: (rows, steps) counts, only if trajectories is True
+
+    With a nsll_store.TrajectorySink as sink, every trajectory is streamed
+    into it as run <row of the table> while the sweep goes on. With the
+    path of an nsll_store.ResultStore as store, the runs in it are reused
+    and the others are added to it.
+    """
+    indptr, indices, cb = nsll.arrays()
+    conf = _store_conf(dict(rng_seed=rng_seed, i_0=nsll.i_0, r_0=nsll.r_0,
+                            steps=steps, replicas=replicas),
+                       store, indptr, indices, cb)
+    jobs = [(point, round(float(a), DIGITS), round(float(b), DIGITS), conf)
+            for point, (a, b) in enumerate(points)]
+    workers = workers or os.cpu_count() or 1
+
+    rows = len(jobs) * replicas
+    table = dict(
+        alpha=np.repeat([job[1] for job in jobs], replicas),
+        beta=np.repeat([job[2] for job in jobs], replicas),
+        replica=np.tile(np.arange(replicas), len(points)),
+    )
+    for c in ('i_max', 'i_max_step', 's_end', 'i_end', 'r_end'):
+        table[c] = np.zeros(rows, dtype=np.int64)
+    if trajectories:
+        for c in 'sir':
+            table[c] = np.zeros((rows, steps), dtype=np.int64)
+    progress = nsll_prof.progress(rows * steps, 'sweep')
+    arrays = nsll.graph_file or dict(indptr=indptr, indices=indices, cb=cb)
+    for point, sir in _stored(jobs, workers, arrays, store):
+        progress.update(replicas * steps)
+        index = slice(point * replicas, (point + 1) * replicas)
+        table['i_max'][index] = sir['i'].max(axis=1)
+        table['i_max_step'][index] = sir['i'].argmax(axis=1)
+        for c in 'sir':
+            table[c + '_end'][index] = sir[c][:, -1]
+            if trajectories:
+                table[c][index] = sir[c]
+        if sink is not None:
+            for replica in range(replicas):
+                sink.extend(zip(range(steps), sir['s'][replica],
+                                sir['i'][replica], sir['r'][replica],
+                                sir['t'][replica]),
+                            run=point * replicas + replica)
+    return table
+
+
+def _se(peaks):
+    """
+    The standard error of the mean of peaks
+    """
+    if peaks.size < 2:
+        return 0.0
+    return peaks.std(ddof=1) / np.sqrt(peaks.size)
+
+
+def _refine(x, y, se, change):
+    """
+    The midpoints of the intervals of the sorted lattice indices x with
+    means y and standard errors se that need another point: where y changes
+    by more than `change` of its range, or where a parabola through the
+    neighbors leaves the chord at the midpoint by more than Z standard
+    errors
+    """
+    span = y.max() - y.min()
+    bend = np.zeros(len(x))
+    for k in range(1, len(x) - 1):
+        # the leading coefficient of the parabola through points k-1, k, k+1
+        bend[k] = abs(((y[k + 1] - y[k]) / (x[k + 1] - x[k]) -
+                       (y[k] - y[k - 1]) / (x[k] - x[k - 1])) /
+                      (x[k + 1] - x[k - 1]))
+    mids = []
+    for k in range(len(x) - 1):
+        h = x[k + 1] - x[k]
+        if h < 2:
+            continue
+        fast = abs(y[k + 1] - y[k]) > change * span
+        bent = (max(bend[k], bend[k + 1]) * h * h / 4 >
+                Z * (se[k] + se[k + 1]) / 2)
+        if fast or bent:
+            mids.append(x[k] + h // 2)
+    return mids
+
+
+def adaptive(nsll, lo, hi, other, axis=0, tol=0.1, initial=9, lattice=65,
+             min_replicas=4, max_replicas=64, change=0.25, steps=250,
+             rng_seed=0, workers=None, deg=1, store=None):
+    """
+    Sweeps alpha (axis 0) or beta (axis 1) from lo to hi, the other one
+    fixed at `other`, on the lattice np.linspace(lo, hi, lattice) of the
+    fixed sweep; replica r of a point draws from the stream of its values
+    as in sweep(), so every epidemic is one the fixed sweep would run.
+
+    It starts from `initial` evenly spaced lattice points ((lattice - 1)
+    must be a multiple of (initial - 1)). Every point gets min_replicas
+    epidemics, then as many more as their spread says are needed until the
+    standard error of its mean I_max is at most tol times the mean, or it
+    has max_replicas. Then the
+    intervals _refine() picks are bisected, until none is or the lattice is
+    full. store is a result store path as for sweep().
+
+    Returns a dict:
+        x, i_max, se, replicas: the points, the mean I_max, its standard
+            error and the number of epidemics of every point
+        simulations: the total number of epidemics
+        fit: fit_band() of the points
+    """
+    if (lattice - 1) % (initial - 1):
+        raise ValueError('lattice - 1 must be a multiple of initial - 1')
+    grid = np.linspace(lo, hi, lattice)
+    samples = dict((j, np.zeros(0, dtype=np.int64))
+                   for j in range(0, lattice, (lattice - 1) // (initial - 1)))
+    indptr, indices, cb = nsll.arrays()
+    arrays = nsll.graph_file or dict(indptr=indptr, indices=indices, cb=cb)
+    conf = _store_conf(dict(rng_seed=rng_seed, i_0=nsll.i_0, r_0=nsll.r_0,
+                            steps=steps), store, indptr, indices, cb)
+    while True:
+        jobs = []
+        for j, peaks in sorted(samples.items()):
+            got = peaks.size
+            if got < min_replicas:
+                more = min_replicas - got
+            elif got < max_replicas and _se(peaks) > tol * max(
+                    peaks.mean(), 1.0):
+                # as many as the spread so far says the tolerance needs
+                need = (peaks.std(ddof=1) / (tol * max(peaks.mean(), 1.0)))
+                more = min(max(int(np.ceil(need * need)) - got, 1),
+                           max_replicas - got)
+            else:
+                continue
+            point = (grid[j], other) if axis == 0 else (other, grid[j])
+            jobs.append((j, round(float(point[0]), DIGITS),
+                         round(float(point[1]), DIGITS),
+                         dict(conf, first=got, replicas=more)))
+        if jobs:
+            nsll_prof.count('adaptive_runs',
+                            sum(job[3]['replicas'] for job in jobs))
+            for j, sir in _stored(jobs, workers or os.cpu_count() or 1,
+                                  arrays, store):
+                samples[j] = np.append(samples[j], sir['i'].max(axis=1))
+            continue
+        x = np.array(sorted(samples))
+        y = np.array([samples[j].mean() for j in x])
+        se = np.array([_se(samples[j]) for j in x])
+        mids = _refine(x, y, se, change)
+        if not mids:
+            break
+        for j in mids:
+            samples[j] = np.zeros(0, dtype=np.int64)
+    replicas = np.array([samples[j].size for j in x])
+    return dict(x=grid[x], i_max=y, se=se, replicas=replicas,
+                simulations=int(replicas.sum()),
+                fit=fit_band(grid[x], y, deg, se))
+
+
+def fit_band(x, y, deg=1, se=None, num=200):
+    """
+    The np.polyfit of y over x, weighted by 1 / se if given, with its 95%
+    confidence band.
+
+    Returns a dict:
+        coef, cov: the polynomial coefficients and their covariance
+        x, fit, lower, upper: the fit and the band at num points
+    """
+    w = None
+    if se is not None and np.any(se > 0):
+        w = 1 / np.maximum(se, se[se > 0].min())
+    coef, cov = np.polyfit(x, y, deg, w=w, cov=True)
+    xs = np.linspace(np.min(x), np.max(x), num)
+    v = np.vander(xs, deg + 1)
+    half = Z * np.sqrt(np.einsum('ij,jk,ik->i', v, cov, v))
+    fit = np.polyval(coef, xs)
+    return dict(coef=coef, cov=cov, x=xs, fit=fit, lower=fit - half,
+                upper=fit + half)
@@ -16,6 +16,8 @@ import networkx as nx
 import numpy as np
 import plotly.offline as py
 
+import nsll_csr
+
 
 def main():
     """
@@ -33,11 +35,11 @@ def main():
         ws[2] = nx.watts_strogatz_graph(1000, 10, p_i, seed='nsll2')
         ws[3] = nx.watts_strogatz_graph(1000, 10, p_i, seed='nsll3')
         ws[4] = nx.watts_strogatz_graph(1000, 10, p_i, seed='nsll4')
-        l_ws[0] = nx.average_shortest_path_length(ws[0])
-        l_ws[1] = nx.average_shortest_path_length(ws[1])
-        l_ws[2] = nx.average_shortest_path_length(ws[2])
-        l_ws[3] = nx.average_shortest_path_length(ws[3])
-        l_ws[4] = nx.average_shortest_path_length(ws[4])
+        l_ws[0] = nsll_csr.average_path_length(*nsll_csr.to_csr(ws[0]))
+        l_ws[1] = nsll_csr.average_path_length(*nsll_csr.to_csr(ws[1]))
+        l_ws[2] = nsll_csr.average_path_length(*nsll_csr.to_csr(ws[2]))
+        l_ws[3] = nsll_csr.average_path_length(*nsll_csr.to_csr(ws[3]))
+        l_ws[4] = nsll_csr.average_path_length(*nsll_csr.to_csr(ws[4]))
 
         a_l[i] = (l_ws[0] + l_ws[1] + l_ws[2] + l_ws[3] + l_ws[4]) / 5
         l_max[i] = max(l_ws) - a_l[i]